@@ -0,0 +1,87 @@
+"""Mide cuánto tarda en aparecer la ventana de login.
+
+Cada corrida es un intérprete nuevo (como al abrir el programa): importa
+main, crea la QApplication y muestra LoginWindow. El tiempo lo toma el
+propio proceso hijo, desde que se lanza hasta que la ventana quedó pintada
+(show + processEvents); no cuenta la salida del intérprete. Informa la
+mediana y qué módulos pesados quedaron cargados antes del login.
+
+Con --precargar el hijo importa antes los módulos pesados, como hacía el
+arranque anterior, para comparar los dos casos con el mismo script.
+
+    python benchmark_arranque.py [--corridas 10] [--precargar]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Módulos que no deberían cargarse antes del login
+MODULOS_PESADOS = ("openpyxl", "reportlab", "kardex", "compras", "inventario", "venta", "usuario", "liberacion")
+
+# Lo que importaba el arranque anterior antes del login (menu importaba todas
+# las ventanas y kardex cargaba openpyxl y reportlab)
+MODULOS_PRECARGA = (
+    "openpyxl", "reportlab.platypus", "reportlab.lib.styles",
+    "compras", "inventario", "venta", "kardex", "usuario", "liberacion",
+)
+
+# `lanzado` es time.time() del padre justo antes de crear el proceso: el reloj
+# de pared es el mismo para los dos procesos (perf_counter no)
+_HIJO = """
+import sys, json, time
+for modulo in {precargar!r}:
+    __import__(modulo)
+from PyQt6.QtWidgets import QApplication
+import main
+app = QApplication(sys.argv)
+ventana = main.LoginWindow()
+ventana.show()
+app.processEvents()
+segundos = time.time() - {lanzado!r}
+print(json.dumps([segundos, sorted(m for m in {modulos!r} if m in sys.modules)]))
+"""
+
+
+def medir_una_vez(precargar=False):
+    """(segundos hasta mostrar el login, módulos pesados cargados), medidos en el hijo."""
+    codigo = _HIJO.format(
+        precargar=MODULOS_PRECARGA if precargar else (),
+        modulos=MODULOS_PESADOS,
+        lanzado=time.time(),
+    )
+    resultado = subprocess.run(
+        [sys.executable, "-c", codigo],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    segundos, cargados = json.loads(resultado.stdout.strip().splitlines()[-1])
+    return segundos, cargados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corridas", type=int, default=10)
+    parser.add_argument("--precargar", action="store_true",
+                        help="importar los módulos pesados antes del login (arranque anterior)")
+    args = parser.parse_args(argv)
+
+    medir_una_vez(args.precargar)  # calienta la caché de disco y los .pyc
+    tiempos = []
+    cargados = []
+    for _ in range(args.corridas):
+        segundos, cargados = medir_una_vez(args.precargar)
+        tiempos.append(segundos)
+
+    modo = "con módulos precargados" if args.precargar else "carga diferida"
+    print(f"Tiempo hasta la ventana de login, {modo} ({args.corridas} corridas): "
+          f"mediana {statistics.median(tiempos) * 1000:.0f} ms, "
+          f"mín {min(tiempos) * 1000:.0f} ms, máx {max(tiempos) * 1000:.0f} ms")
+    print("Módulos pesados cargados antes del login:", ", ".join(cargados) or "ninguno")
+
+
+if __name__ == "__main__":
+    main()
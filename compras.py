@@ -2,12 +2,15 @@ import sys
 import os
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout,
-    QComboBox, QMessageBox, QTableWidget, QTableWidgetItem, QSpinBox, QDateEdit, QLineEdit
+    QComboBox, QMessageBox, QTableWidget, QTableWidgetItem, QSpinBox, QDateEdit, QLineEdit,
+    QTableView, QAbstractItemView
 )
 from PyQt6.QtGui import QIcon
 from PyQt6.QtCore import QDate
-import sqlite3
+import consultas
 import database as db
+from modelos import Columna, ModeloPaginado
+from servicio_compras import LineaCompra, registrar_compra
 
 def resource_path(relative_path):
     """Obtiene la ruta absoluta del recurso, compatible con PyInstaller."""
@@ -21,9 +24,11 @@ def resource_path(relative_path):
 # VENTANA PRINCIPAL DE COMPRAS
 # ======================
 class ComprasWindow(QMainWindow):
-    def __init__(self, role="Usuario"):
+    def __init__(self, role="Usuario", username=None):
         super().__init__()
         self.role = role
+        # None si la sesión no tiene un usuario válido: no se registra nada a su nombre
+        self.usuario_id = db.id_usuario(username) if username else None
         self.setWindowTitle("Registro y Historial de Compras")
         self.setMinimumSize(900, 600)
         self.setWindowIcon(QIcon(resource_path("mainlogo.ico")))
@@ -47,12 +52,23 @@ class ComprasWindow(QMainWindow):
         filtro_layout.addWidget(btn_filtrar)
         layout.addLayout(filtro_layout)
 
-        # Tabla de compras
-        self.compras_table = QTableWidget()
-        self.compras_table.setColumnCount(6)
-        self.compras_table.setHorizontalHeaderLabels(
-            ["Número", "Fecha", "Producto", "Cantidad", "Precio unitario", "Total"]
+        # Tabla de compras: se lee por páginas a medida que se hace scroll
+        self.compras_model = ModeloPaginado(
+            [
+                Columna("Número", "c.id_compra"),
+                Columna("Fecha", "c.fecha"),
+                Columna("Producto", "p.nombre"),
+                Columna("Cantidad", "d.cantidad"),
+                Columna("Precio unitario", "d.precio_unitario", lambda precio: f"{precio:.2f}"),
+                Columna("Total", "d.cantidad * d.precio_unitario", lambda total: f"{total:.2f}"),
+            ],
+            consultas.HISTORIAL_COMPRAS_DESDE,
+            consultas.HISTORIAL_COMPRAS_CLAVES,
+            parent=self,
         )
+        self.compras_table = QTableView()
+        self.compras_table.setModel(self.compras_model)
+        self.compras_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         layout.addWidget(self.compras_table)
 
         # ======================
@@ -82,12 +98,30 @@ class ComprasWindow(QMainWindow):
         form_layout.addWidget(QLabel("Fecha:"))
         form_layout.addWidget(self.fecha_edit)
 
-        btn_registrar = QPushButton("Registrar Compra")
-        btn_registrar.clicked.connect(self.confirm_purchase)
-        form_layout.addWidget(btn_registrar)
+        btn_agregar = QPushButton("Agregar a la compra")
+        btn_agregar.clicked.connect(self.agregar_linea)
+        form_layout.addWidget(btn_agregar)
 
         layout.addLayout(form_layout)
 
+        # Líneas de la compra en curso (una factura puede traer muchos productos)
+        self.carrito = []  # [(LineaCompra, nombre, precio mostrado)]
+        self.carrito_table = QTableWidget()
+        self.carrito_table.setColumnCount(4)
+        self.carrito_table.setHorizontalHeaderLabels(["Producto", "Cantidad", "Precio unitario", "Subtotal"])
+        layout.addWidget(self.carrito_table)
+
+        carrito_layout = QHBoxLayout()
+        btn_quitar = QPushButton("Quitar línea")
+        btn_quitar.clicked.connect(self.quitar_linea)
+        carrito_layout.addWidget(btn_quitar)
+        self.total_label = QLabel("Total: 0.00")
+        carrito_layout.addWidget(self.total_label)
+        btn_registrar = QPushButton("Registrar Compra")
+        btn_registrar.clicked.connect(self.confirm_purchase)
+        carrito_layout.addWidget(btn_registrar)
+        layout.addLayout(carrito_layout)
+
         # ======================
         # BOTÓN AGREGAR PRODUCTOS (solo admin)
         # ======================
@@ -101,42 +135,25 @@ class ComprasWindow(QMainWindow):
 
     def load_product_combo(self):
         self.product_combo.clear()
-        conn = sqlite3.connect(db.DB_NAME)
+        self.precios_producto = {}
+        conn = db.get_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT id_producto, nombre FROM productos")
+        cursor.execute("SELECT id_producto, nombre, precio FROM productos")
         rows = cursor.fetchall()
-        for pid, nombre in rows:
+        for pid, nombre, precio in rows:
             self.product_combo.addItem(nombre, pid)
-        conn.close()
+            self.precios_producto[pid] = precio
 
     def load_compras(self):
-        self.compras_table.setRowCount(0)
-        fecha = self.mes_edit.date()
-        mes = fecha.month()
-        anio = fecha.year()
-
-        conn = sqlite3.connect(db.DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT c.id_compra, c.fecha, p.nombre, d.cantidad, d.precio_unitario, d.cantidad*d.precio_unitario as total
-            FROM compras c
-            JOIN detalle_compras d ON c.id_compra = d.id_compra
-            JOIN productos p ON d.id_producto = p.id_producto
-            WHERE strftime('%m', c.fecha) = ? AND strftime('%Y', c.fecha) = ?
-            ORDER BY c.fecha ASC
-        """, (f"{mes:02d}", str(anio)))
-        rows = cursor.fetchall()
-        self.compras_table.setRowCount(len(rows))
-        for i, (num, fecha, producto, cantidad, precio_unitario, total) in enumerate(rows):
-            self.compras_table.setItem(i, 0, QTableWidgetItem(str(num)))
-            self.compras_table.setItem(i, 1, QTableWidgetItem(fecha))
-            self.compras_table.setItem(i, 2, QTableWidgetItem(producto))
-            self.compras_table.setItem(i, 3, QTableWidgetItem(str(cantidad)))
-            self.compras_table.setItem(i, 4, QTableWidgetItem(f"{precio_unitario:.2f}"))
-            self.compras_table.setItem(i, 5, QTableWidgetItem(f"{total:.2f}"))
-        conn.close()
-
-    def confirm_purchase(self):
+        # Rango [primer día del mes, primer día del mes siguiente) sobre la
+        # columna tal cual, para que SQLite use idx_compras_fecha
+        inicio = QDate(self.mes_edit.date().year(), self.mes_edit.date().month(), 1)
+        self.compras_model.set_filtros([
+            ("c.fecha >= ? AND c.fecha < ?",
+             (inicio.toString("yyyy-MM-dd"), inicio.addMonths(1).toString("yyyy-MM-dd"))),
+        ])
+
+    def agregar_linea(self):
         producto_id = self.product_combo.currentData()
 
         # --- VALIDACIÓN: debe haber al menos un producto ---
@@ -144,57 +161,64 @@ class ComprasWindow(QMainWindow):
             QMessageBox.warning(self, "Error", "No hay productos disponibles para registrar la compra.")
             return
 
-        fecha = self.fecha_edit.date().toString("yyyy-MM-dd")
-        cantidad = self.cantidad_spin.value()
-
-        conn = sqlite3.connect(db.DB_NAME)
-        cursor = conn.cursor()
-
-        # Número de compra automático
-        cursor.execute("SELECT MAX(id_compra) FROM compras")
-        last = cursor.fetchone()[0]
-        next_id = 1 if last is None else last + 1
-
-        # Precio ingresado por el usuario (opcional)
+        # Precio ingresado por el usuario (opcional; si no, el del producto)
         precio_texto = self.precio_input.text().strip()
         if precio_texto == "":
-            # Usar precio del producto si no se ingresa nada
-            cursor.execute("SELECT precio FROM productos WHERE id_producto=?", (producto_id,))
-            precio_unitario = cursor.fetchone()[0]
+            precio_unitario = None
+            precio_mostrado = self.precios_producto.get(producto_id, 0.0)
         else:
             try:
-                precio_unitario = float(precio_texto)
+                precio_unitario = precio_mostrado = float(precio_texto)
             except ValueError:
                 QMessageBox.warning(self, "Error", "Precio inválido.")
-                conn.close()
                 return
 
-        total = precio_unitario * cantidad
-
-        # Insertar compra
-        cursor.execute(
-            "INSERT INTO compras (id_compra, fecha, usuario_id, proveedor_id, total) VALUES (?, ?, ?, ?, ?)",
-            (next_id, fecha, 1, None, total)
-        )
-        cursor.execute(
-            "INSERT INTO detalle_compras (id_compra, id_producto, cantidad, precio_unitario) VALUES (?, ?, ?, ?)",
-            (next_id, producto_id, cantidad, precio_unitario)
-        )
+        cantidad = self.cantidad_spin.value()
+        self.carrito.append((LineaCompra(producto_id, cantidad, precio_unitario),
+                             self.product_combo.currentText(), precio_mostrado))
+        self.precio_input.clear()
+        self.refrescar_carrito()
+
+    def quitar_linea(self):
+        fila = self.carrito_table.currentRow()
+        if 0 <= fila < len(self.carrito):
+            del self.carrito[fila]
+            self.refrescar_carrito()
+
+    def refrescar_carrito(self):
+        self.carrito_table.setRowCount(len(self.carrito))
+        total = 0.0
+        for i, (linea, nombre, precio) in enumerate(self.carrito):
+            subtotal = linea.cantidad * precio
+            total += subtotal
+            self.carrito_table.setItem(i, 0, QTableWidgetItem(nombre))
+            self.carrito_table.setItem(i, 1, QTableWidgetItem(str(linea.cantidad)))
+            self.carrito_table.setItem(i, 2, QTableWidgetItem(f"{precio:.2f}"))
+            self.carrito_table.setItem(i, 3, QTableWidgetItem(f"{subtotal:.2f}"))
+        self.total_label.setText(f"Total: {total:.2f}")
 
-        # Insertar en inventarios
-        cursor.execute(
-            "INSERT INTO inventarios (id_producto, cantidad, precio_unitario, fecha_compra, id_compra) VALUES (?, ?, ?, ?, ?)",
-            (producto_id, cantidad, precio_unitario, fecha, next_id)
-        )
+    def confirm_purchase(self):
+        if not self.carrito:
+            QMessageBox.warning(self, "Error", "Agregue al menos un producto a la compra.")
+            return
+        if self.usuario_id is None:
+            QMessageBox.warning(self, "Error", "No se pudo identificar al usuario de la sesión; vuelva a iniciar sesión.")
+            return
 
-        # Actualizar stock del producto
-        cursor.execute("UPDATE productos SET stock = stock + ? WHERE id_producto=?", (cantidad, producto_id))
+        fecha = self.fecha_edit.date().toString("yyyy-MM-dd")
+        try:
+            # Compra, detalle, lotes de inventario y stock en una sola transacción
+            id_compra, total = registrar_compra(fecha, [linea for linea, _, _ in self.carrito], usuario_id=self.usuario_id)
+        except ValueError as e:
+            QMessageBox.warning(self, "Error", str(e))
+            return
 
-        conn.commit()
-        conn.close()
+        self.carrito = []
+        self.refrescar_carrito()
         self.load_product_combo()
-        self.load_compras()
-        QMessageBox.information(self, "Éxito", f"Compra #{next_id} registrada.\nTotal: {total:.2f}")
+        # Se inserta sólo la compra nueva (si es del mes que se está viendo)
+        self.compras_model.agregar_filas_donde("c.id_compra = ?", (id_compra,))
+        QMessageBox.information(self, "Éxito", f"Compra #{id_compra} registrada.\nTotal: {total:.2f}")
 
 
     # ======================
@@ -240,13 +264,12 @@ class ProductosWindow(QMainWindow):
 
     def load_proveedores(self):
         self.proveedor_combo.clear()
-        conn = sqlite3.connect(db.DB_NAME)
+        conn = db.get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT id_proveedor, nombre FROM proveedores")
         rows = cursor.fetchall()
         for pid, nombre in rows:
             self.proveedor_combo.addItem(nombre, pid)
-        conn.close()
 
     def add_product(self):
         nombre = self.nombre_input.text()
@@ -257,12 +280,11 @@ class ProductosWindow(QMainWindow):
             QMessageBox.warning(self, "Error", "Precio inválido")
             return
 
-        conn = sqlite3.connect(db.DB_NAME)
+        conn = db.get_connection()
         cursor = conn.cursor()
         cursor.execute("INSERT INTO productos (nombre, proveedor_id, precio, stock) VALUES (?, ?, ?, ?)",
                        (nombre, proveedor_id, precio, 0))
         conn.commit()
-        conn.close()
 
         self.nombre_input.clear()
         self.precio_input.clear()
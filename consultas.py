@@ -0,0 +1,137 @@
+"""Consultas SQL de los servicios y las ventanas.
+
+Viven acá para que database.verificar_indices revise con EXPLAIN QUERY PLAN
+el mismo texto que se ejecuta. Los campos entre llaves se completan con
+str.format: {marcadores} es la lista de "?" de un IN y {filtro} una
+condición extra.
+"""
+
+# --- Productos (database.consultar_por_bloques completa {marcadores}) ---
+STOCK_PRODUCTOS = "SELECT id_producto, nombre, stock FROM productos WHERE id_producto IN ({marcadores})"
+PRECIOS_PRODUCTOS = "SELECT id_producto, precio FROM productos WHERE id_producto IN ({marcadores})"
+
+# --- Liberaciones ---
+# Lotes abiertos de varios productos; el orden sigue idx_inventarios_producto_fecha
+LOTES_ABIERTOS = """
+    SELECT id_producto, id, cantidad, precio_unitario, fecha_compra
+    FROM inventarios
+    WHERE id_producto IN ({marcadores})
+      AND cantidad > 0
+      AND fecha_compra <= ?
+    ORDER BY id_producto ASC, fecha_compra ASC, id ASC
+"""
+
+# Lotes abiertos de un producto (vistas previas de la liberación)
+LOTES_DE_PRODUCTO = """
+    SELECT id, cantidad, precio_unitario, fecha_compra
+    FROM inventarios
+    WHERE id_producto = ? AND cantidad > 0
+    ORDER BY fecha_compra ASC, id ASC
+"""
+
+# Lotes abiertos de todos los productos, en orden de compra (liberar_pendientes)
+LOTES_ABIERTOS_HASTA = """
+    SELECT id_producto, id, cantidad, precio_unitario, fecha_compra
+    FROM inventarios
+    WHERE cantidad > 0 AND fecha_compra <= ?
+    ORDER BY fecha_compra ASC, id ASC
+"""
+
+# Ventas sin liberar hasta una fecha, con su detalle
+VENTAS_PENDIENTES = """
+    SELECT v.id_venta, v.fecha, d.id_producto, d.cantidad
+    FROM ventas v
+    LEFT JOIN detalle_ventas d ON d.id_venta = v.id_venta
+    WHERE NOT EXISTS (SELECT 1 FROM liberaciones l WHERE l.id_venta = v.id_venta)
+      AND v.fecha <= ?
+    ORDER BY v.fecha ASC, v.id_venta ASC, d.id_detalle ASC
+"""
+
+LIBERACION_DE_VENTA = "SELECT 1 FROM liberaciones WHERE id_venta = ?"
+
+DETALLE_VENTA = "SELECT id_producto, cantidad FROM detalle_ventas WHERE id_venta = ?"
+
+# Cada lote suma lo que le tomaron las liberaciones que cumplen {filtro}
+DEVOLVER_LOTES = """
+    UPDATE inventarios
+    SET cantidad = cantidad + (SELECT SUM(li.cantidad) FROM liberacion_inventarios li
+                               WHERE li.id_inventario = inventarios.id AND {filtro})
+    WHERE id IN (SELECT li.id_inventario FROM liberacion_inventarios li WHERE {filtro})
+"""
+FILTRO_LIBERACION = "li.id_liberacion = ?"
+FILTRO_LIBERACIONES_VENTA = "li.id_liberacion IN (SELECT id_liberacion FROM liberaciones WHERE id_venta = ?)"
+
+# --- Borrado de ventas y compras ---
+DEVOLVER_STOCK_VENTA = """
+    UPDATE productos
+    SET stock = stock + (SELECT SUM(d.cantidad) FROM detalle_ventas d
+                         WHERE d.id_venta = ? AND d.id_producto = productos.id_producto)
+    WHERE id_producto IN (SELECT id_producto FROM detalle_ventas WHERE id_venta = ?)
+"""
+
+QUITAR_STOCK_COMPRA = """
+    UPDATE productos
+    SET stock = stock - (SELECT SUM(d.cantidad) FROM detalle_compras d
+                         WHERE d.id_compra = ? AND d.id_producto = productos.id_producto)
+    WHERE id_producto IN (SELECT id_producto FROM detalle_compras WHERE id_compra = ?)
+"""
+
+# --- Kardex ---
+# Compras (lotes) y ventas en una sola lista ordenada; {filtro_compras} y
+# {filtro_ventas} quedan vacíos o limitan a una partición de productos
+MOVIMIENTOS_KARDEX = """
+    SELECT i.fecha_compra AS fecha, ? AS tipo, i.id AS ref, 0 AS detalle,
+           i.id_producto, p.nombre, i.cantidad, i.precio_unitario
+    FROM inventarios i
+    JOIN productos p ON p.id_producto = i.id_producto
+    JOIN compras c ON c.id_compra = i.id_compra
+    WHERE i.fecha_compra > ? AND i.fecha_compra <= ?{filtro_compras}
+    UNION ALL
+    SELECT v.fecha, ?, v.id_venta, dv.id_detalle,
+           dv.id_producto, p.nombre, dv.cantidad, dv.precio_unitario
+    FROM ventas v
+    JOIN detalle_ventas dv ON dv.id_venta = v.id_venta
+    JOIN productos p ON p.id_producto = dv.id_producto
+    WHERE v.fecha > ? AND v.fecha <= ?{filtro_ventas}
+    ORDER BY fecha, tipo, ref, detalle
+"""
+PARTICION_COMPRAS = " AND i.id_producto % ? = ?"
+PARTICION_VENTAS = " AND dv.id_producto % ? = ?"
+
+# --- Tablas paginadas (modelos.ModeloPaginado) ---
+# Las claves siguen el orden de un índice, así no hay que ordenar aparte
+INVENTARIO_DESDE = """FROM inventarios i
+    JOIN productos p ON i.id_producto = p.id_producto
+    JOIN compras c ON i.id_compra = c.id_compra"""
+INVENTARIO_CLAVES = ("c.fecha", "c.id_compra", "i.id")  # idx_compras_fecha + idx_inventarios_compra
+
+HISTORIAL_COMPRAS_DESDE = """FROM compras c
+    JOIN detalle_compras d ON c.id_compra = d.id_compra
+    JOIN productos p ON d.id_producto = p.id_producto"""
+HISTORIAL_COMPRAS_CLAVES = ("c.fecha", "c.id_compra", "d.id_detalle")  # idx_compras_fecha
+
+HISTORIAL_VENTAS_DESDE = """FROM ventas v
+    JOIN detalle_ventas d ON v.id_venta = d.id_venta
+    LEFT JOIN clientes c ON v.cliente_id = c.id_cliente
+    JOIN productos p ON d.id_producto = p.id_producto"""
+HISTORIAL_VENTAS_CLAVES = ("d.id_venta", "d.id_detalle")  # idx_detalle_ventas_venta
+
+
+def sql_pagina(expresiones, desde, claves, condiciones, despues_de_clave=False):
+    """SELECT de una página: `expresiones` más las claves, en orden de claves.
+
+    Con `despues_de_clave` se agregan las condiciones de keyset; sus
+    parámetros son la primera clave y luego la tupla de claves de la última
+    fila leída. El último parámetro siempre es el LIMIT.
+    """
+    condiciones = list(condiciones)
+    if despues_de_clave:
+        # La primera clave sola permite buscar en el índice; la tupla desempata
+        condiciones.append(f"{claves[0]} >= ?")
+        condiciones.append(f"({', '.join(claves)}) > ({', '.join('?' * len(claves))})")
+    return (
+        f"SELECT {', '.join([*expresiones, *claves])} "
+        f"{desde} "
+        f"{'WHERE ' + ' AND '.join(condiciones) if condiciones else ''} "
+        f"ORDER BY {', '.join(claves)} LIMIT ?"
+    )
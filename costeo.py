@@ -0,0 +1,574 @@
+"""Motor de costeo del kardex (PMP, PEPS y UEPS).
+
+No depende de Qt: recibe los movimientos (compras como lotes de inventario
+y ventas) y produce las filas del kardex y el estado de los lotes, de modo
+que lo puedan usar las ventanas, los reportes y procesos sin interfaz.
+"""
+import calendar
+import heapq
+import json
+import multiprocessing
+import os
+import pickle
+import sqlite3
+import tempfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import ExitStack
+from itertools import chain
+from operator import itemgetter
+from pathlib import Path
+
+import consultas
+
+METODOS = ("PMP", "PEPS", "UEPS")
+
+# Cada cuántos movimientos se consulta si el kardex fue cancelado
+EVENTOS_POR_REVISION = 1000
+# Segundos entre revisiones de cancelación mientras se esperan las particiones
+ESPERA_PARTICIONES = 0.1
+
+# Tipos de movimiento; en la misma fecha las compras van antes que las ventas
+COMPRA = 0
+VENTA = 1
+
+COLUMNAS = [
+    "Fecha", "Tipo", "Producto", "ID",
+    "Cantidad", "Precio Unitario", "Valor Total",
+    "Cantidad", "Precio Unitario", "Valor Total",
+    "Cantidad", "Precio Unitario", "Valor Total"
+]
+GRUPOS = [
+    "", "", "", "",
+    "Entradas", "Entradas", "Entradas",
+    "Salidas", "Salidas", "Salidas",
+    "Inventario Final", "Inventario Final", "Inventario Final"
+]
+
+# Columnas numéricas de una fila del kardex
+COLUMNAS_CANTIDAD = (4, 7, 10)
+COLUMNAS_IMPORTE = (5, 6, 8, 9, 11, 12)
+
+
+def safe_int(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return 0
+
+
+def safe_float(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def metodo_desde_etiqueta(etiqueta):
+    """'PEPS (FIFO)' -> 'PEPS'"""
+    for metodo in METODOS:
+        if etiqueta.startswith(metodo):
+            return metodo
+    raise ValueError(f"Método de costeo desconocido: {etiqueta}")
+
+
+def formatear_celda(col, valor):
+    """Texto de una celda del kardex: None se muestra como '-'."""
+    if valor is None:
+        return "-"
+    if col in COLUMNAS_IMPORTE and valor != "":
+        return f"{valor:.2f}"
+    return str(valor)
+
+
+def formatear_fila(fila):
+    return [formatear_celda(col, valor) for col, valor in enumerate(fila)]
+
+
+class Movimiento:
+    """Compra (lote de inventario) o venta de un producto.
+
+    `ref` es el id del inventario en las compras y el id de la venta en las ventas;
+    `detalle` es el id del detalle de venta (0 en las compras).
+    """
+    __slots__ = ("fecha", "tipo", "ref", "detalle", "producto_id", "producto", "cantidad", "precio")
+
+    def __init__(self, fecha, tipo, ref, detalle, producto_id, producto, cantidad, precio):
+        self.fecha = fecha
+        self.tipo = tipo
+        self.ref = ref
+        self.detalle = detalle
+        self.producto_id = producto_id
+        self.producto = producto
+        self.cantidad = cantidad
+        self.precio = precio
+
+
+class Lote:
+    __slots__ = ("id_inventario", "cantidad", "precio", "fecha")
+
+    def __init__(self, id_inventario, cantidad, precio, fecha):
+        self.id_inventario = id_inventario
+        self.cantidad = cantidad
+        self.precio = precio
+        self.fecha = fecha
+
+
+class FilaFaltante(tuple):
+    """Fila de la parte de una venta PEPS/UEPS que no alcanzó a cubrir ningún lote.
+
+    Repite la venta completa para que se vea en el kardex; las salidas ya
+    quedaron en las filas de cada lote, así que los totales no la suman.
+    """
+    __slots__ = ()
+
+
+class MotorCosteo:
+    """Estado de costeo por producto para un método.
+
+    Las filas que devuelve tienen las 13 columnas de COLUMNAS con valores
+    crudos (números sin formato); None equivale a '-'.
+    """
+
+    def __init__(self, metodo):
+        if metodo not in METODOS:
+            raise ValueError(f"Método de costeo desconocido: {metodo}")
+        self.metodo = metodo
+        self.lotes = {}       # pid -> deque([Lote, ...]) en orden de compra
+        self.promedios = {}   # PMP: pid -> { cantidad, precio_prom }
+        self.nombres = {}     # pid -> nombre del producto
+
+    # --- Operaciones básicas ---
+    def compra(self, pid, id_inventario, cantidad, precio, fecha):
+        if self.metodo == "PMP":
+            prog = self.promedios.get(pid, {"cantidad": 0, "precio_prom": 0.0})
+            q0, p0 = prog["cantidad"], prog["precio_prom"]
+            if q0 + cantidad > 0:
+                nuevo_prom = ((q0 * p0) + (cantidad * precio)) / (q0 + cantidad)
+            else:
+                nuevo_prom = 0.0
+            self.promedios[pid] = {"cantidad": q0 + cantidad, "precio_prom": nuevo_prom}
+        elif cantidad > 0:
+            self.lotes.setdefault(pid, deque()).append(Lote(id_inventario, cantidad, precio, fecha))
+
+    def venta(self, pid, cantidad):
+        """Descuenta `cantidad` del producto.
+
+        Devuelve (consumos, faltante): consumos es la lista de (lote, tomado)
+        en el orden del método (vacía en PMP) y faltante lo que no alcanzó.
+        Los lotes agotados salen de la cola.
+        """
+        if self.metodo == "PMP":
+            prog = self.promedios.setdefault(pid, {"cantidad": 0, "precio_prom": 0.0})
+            disponible = prog["cantidad"]
+            tomado = min(disponible, cantidad)
+            prog["cantidad"] = max(disponible - tomado, 0)
+            return [], cantidad - tomado
+
+        lots = self.lotes.get(pid)
+        consumos = []
+        remaining = cantidad
+        # PEPS consume la entrada más antigua (izquierda), UEPS la más reciente (derecha)
+        peps = self.metodo == "PEPS"
+        while remaining > 0 and lots:
+            lot = lots[0] if peps else lots[-1]
+            take = min(lot.cantidad, remaining)
+            lot.cantidad -= take
+            remaining -= take
+            consumos.append((lot, take))
+            if lot.cantidad <= 0:
+                if peps:
+                    lots.popleft()
+                else:
+                    lots.pop()
+        return consumos, remaining
+
+    def lotes_vivos(self, pid):
+        # En la cola sólo quedan lotes con existencias
+        return list(self.lotes.get(pid, ()))
+
+    # --- Movimientos ---
+    def aplicar(self, ev):
+        """Aplica un movimiento sin generar filas (saldo inicial)."""
+        pid = ev.producto_id
+        self.nombres[pid] = ev.producto
+        if ev.tipo == COMPRA:
+            self.compra(pid, ev.ref, ev.cantidad, ev.precio, ev.fecha)
+        else:
+            self.venta(pid, ev.cantidad)
+
+    def filas_movimiento(self, ev):
+        """Aplica un movimiento y devuelve sus filas del kardex."""
+        pid = ev.producto_id
+        nombre = ev.producto
+        self.nombres[pid] = nombre
+        fecha, cantidad, precio = ev.fecha, ev.cantidad, ev.precio
+
+        if ev.tipo == COMPRA:
+            self.compra(pid, ev.ref, cantidad, precio, fecha)
+            if self.metodo == "PMP":
+                prog = self.promedios[pid]
+                total_after, avg_after = prog["cantidad"], prog["precio_prom"]
+                return [(
+                    fecha, "Compra", str(nombre), ev.ref,
+                    cantidad, precio, cantidad * precio,
+                    None, None, None,
+                    total_after, avg_after, total_after * avg_after
+                )]
+            return [(
+                fecha, "Compra", str(nombre), ev.ref,
+                cantidad, precio, cantidad * precio,
+                None, None, None,
+                cantidad, precio, cantidad * precio
+            )]
+
+        consumos, faltante = self.venta(pid, cantidad)
+        if self.metodo == "PMP":
+            prog = self.promedios[pid]
+            total_after, precio_prom = prog["cantidad"], prog["precio_prom"]
+            return [(
+                fecha, "Venta", str(nombre), None,
+                None, None, None,
+                cantidad, precio, cantidad * precio,
+                total_after if faltante == 0 else -faltante, precio_prom,
+                (total_after if total_after > 0 else 0) * precio_prom
+            )]
+
+        filas = []
+        for lot, take in consumos:
+            filas.append((
+                fecha, "Venta", str(nombre), lot.id_inventario,
+                None, None, None,
+                take, lot.precio, take * lot.precio,
+                lot.cantidad, lot.precio, lot.cantidad * lot.precio
+            ))
+        if faltante > 0:
+            filas.append(FilaFaltante((
+                fecha, "Venta", str(nombre), None,
+                None, None, None,
+                cantidad, precio, cantidad * precio,
+                -faltante, 0.0, 0.0
+            )))
+        return filas
+
+    def filas_finales(self):
+        """Filas de inventario final (por lote) y TOTAL por producto."""
+        filas = []
+        for pid in sorted(self.productos()):
+            filas.extend(self.filas_finales_producto(pid))
+        return filas
+
+    def filas_finales_producto(self, pid):
+        nombre = self.nombres.get(pid, str(pid))
+        if self.metodo == "PMP":
+            prog = self.promedios[pid]
+            cant = safe_int(prog["cantidad"])
+            if cant <= 0:
+                return []
+            return [(
+                None, "TOTAL", str(nombre), None,
+                None, None, None,
+                None, None, None,
+                cant, prog["precio_prom"], cant * safe_float(prog["precio_prom"])
+            )]
+
+        filas = []
+        lots = self.lotes_vivos(pid)
+        for lot in lots:
+            filas.append((
+                lot.fecha, "Inventario Final", str(nombre), lot.id_inventario,
+                None, None, None,
+                None, None, None,
+                lot.cantidad, lot.precio, lot.cantidad * lot.precio
+            ))
+        sum_qty = sum(safe_int(l.cantidad) for l in lots)
+        if sum_qty > 0:
+            sum_total = sum(safe_int(l.cantidad) * safe_float(l.precio) for l in lots)
+            filas.append((
+                None, "TOTAL", str(nombre), None,
+                None, None, None,
+                None, None, None,
+                sum_qty, "", sum_total
+            ))
+        return filas
+
+    def productos(self):
+        return set(self.lotes) | set(self.promedios)
+
+
+# ================================
+# Movimientos desde la base de datos
+# ================================
+def obtener_eventos(conn, desde, hasta, particion=None):
+    """Compras (lotes de inventario) y ventas con desde < fecha <= hasta, en orden.
+
+    Una sola consulta ordenada por fecha, tipo (compras primero) e id; las filas
+    se convierten a medida que se leen del cursor. Con `particion=(n, i)` sólo
+    se leen los productos con id_producto % n == i.
+    """
+    filtro_compras = filtro_ventas = ""
+    params_compras, params_ventas = (COMPRA, desde, hasta), (VENTA, desde, hasta)
+    if particion:
+        filtro_compras, filtro_ventas = consultas.PARTICION_COMPRAS, consultas.PARTICION_VENTAS
+        params_compras += tuple(particion)
+        params_ventas += tuple(particion)
+
+    cursor = conn.execute(
+        consultas.MOVIMIENTOS_KARDEX.format(filtro_compras=filtro_compras, filtro_ventas=filtro_ventas),
+        params_compras + params_ventas
+    )
+    for fecha, tipo, ref, detalle, id_producto, nombre, cantidad, precio in cursor:
+        yield Movimiento(fecha, tipo, ref, detalle, id_producto, nombre, safe_int(cantidad), safe_float(precio))
+
+
+def completar_nombres(cursor, motor):
+    faltan = [pid for pid in motor.productos() if pid not in motor.nombres]
+    for pid in faltan:
+        cursor.execute("SELECT nombre FROM productos WHERE id_producto = ? LIMIT 1", (pid,))
+        pr = cursor.fetchone()
+        motor.nombres[pid] = pr[0] if pr else str(pid)
+
+
+# ================================
+# Cortes mensuales del kardex
+# ================================
+def fin_de_mes(fecha):
+    """'2025-02-14' -> '2025-02-28'"""
+    anio, mes = int(fecha[:4]), int(fecha[5:7])
+    return f"{anio:04d}-{mes:02d}-{calendar.monthrange(anio, mes)[1]:02d}"
+
+
+def fin_de_mes_anterior(fecha):
+    """Último día del mes anterior al de `fecha`."""
+    anio, mes = int(fecha[:4]), int(fecha[5:7])
+    if mes == 1:
+        anio, mes = anio - 1, 12
+    else:
+        mes -= 1
+    return fin_de_mes(f"{anio:04d}-{mes:02d}-01")
+
+
+def cargar_corte(cursor, motor, fecha_inicio, particion=None):
+    """Carga en el motor el corte más reciente anterior a fecha_inicio.
+
+    Devuelve la fecha del corte ('' si no hay ninguno, para replayar desde
+    el principio).
+    """
+    cursor.execute("""
+        SELECT MAX(fecha_corte) FROM kardex_cortes
+        WHERE metodo = ? AND fecha_corte < ?
+    """, (motor.metodo, fecha_inicio))
+    corte = cursor.fetchone()[0]
+    if not corte:
+        return ""
+
+    sql = """
+        SELECT id_producto, cantidad, precio_prom, lotes
+        FROM kardex_snapshots
+        WHERE metodo = ? AND fecha_corte = ?
+    """
+    params = (motor.metodo, corte)
+    if particion:
+        sql += " AND id_producto % ? = ?"
+        params += tuple(particion)
+    cursor.execute(sql, params)
+    for pid, cantidad, precio_prom, lotes in cursor.fetchall():
+        if motor.metodo == "PMP":
+            motor.promedios[pid] = {"cantidad": cantidad, "precio_prom": precio_prom}
+        else:
+            motor.lotes[pid] = deque(Lote(*datos) for datos in json.loads(lotes or "[]"))
+    return corte
+
+
+def guardar_corte(cursor, motor, fecha_corte):
+    """Guarda el estado actual del motor como corte de `fecha_corte`."""
+    metodo = motor.metodo
+    filas = []
+    if metodo == "PMP":
+        # El promedio se conserva aunque no haya existencias (se muestra en ventas con faltante)
+        for pid, prog in motor.promedios.items():
+            filas.append((metodo, fecha_corte, pid, prog["cantidad"], prog["precio_prom"], None))
+    else:
+        for pid in motor.lotes:
+            vivos = [[l.id_inventario, l.cantidad, l.precio, l.fecha]
+                     for l in motor.lotes_vivos(pid)]
+            if vivos:
+                filas.append((metodo, fecha_corte, pid, sum(l[1] for l in vivos), 0.0, json.dumps(vivos)))
+
+    cursor.execute("DELETE FROM kardex_snapshots WHERE metodo = ? AND fecha_corte = ?", (metodo, fecha_corte))
+    cursor.executemany("""
+        INSERT INTO kardex_snapshots (metodo, fecha_corte, id_producto, cantidad, precio_prom, lotes)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, filas)
+    cursor.execute("INSERT OR REPLACE INTO kardex_cortes (metodo, fecha_corte) VALUES (?, ?)", (metodo, fecha_corte))
+
+
+def generar_kardex(conn, metodo, fecha_inicio, fecha_fin, guardar_cortes=True, cancelado=None):
+    """Filas del kardex entre fecha_inicio y fecha_fin (ambas 'yyyy-MM-dd').
+
+    El saldo inicial sale del último corte mensual anterior a fecha_inicio
+    más los movimientos posteriores a él; al cruzar cada fin de mes se
+    guarda un corte nuevo. Termina con las filas de inventario final.
+    Si `cancelado()` devuelve True las filas se cortan ahí.
+    """
+    for _clave, filas in _recorrer_kardex(conn, metodo, fecha_inicio, fecha_fin, guardar_cortes, cancelado=cancelado):
+        for fila in filas:
+            yield fila
+
+
+def valuacion(conn, metodo, fecha, guardar_cortes=True):
+    """Existencia y valor por producto al cierre de `fecha`.
+
+    Devuelve (producto, cantidad, costo unitario, valor) de cada producto con
+    existencias, tomados de las filas TOTAL del kardex.
+    """
+    filas = []
+    for fila in generar_kardex(conn, metodo, fecha, fecha, guardar_cortes):
+        if fila[1] == "TOTAL":
+            producto, cantidad, valor = fila[2], fila[10], fila[12]
+            filas.append((producto, cantidad, valor / cantidad if cantidad else 0.0, valor))
+    return filas
+
+
+def _recorrer_kardex(conn, metodo, fecha_inicio, fecha_fin, guardar_cortes, particion=None, cancelado=None):
+    """Como generar_kardex, pero agrupa las filas por movimiento/producto.
+
+    Cada grupo va con una clave ordenable: (0, fecha, tipo, ref, detalle) para
+    los movimientos y (1, id_producto) para el inventario final, de modo que
+    los resultados de varias particiones se puedan intercalar con heapq.merge.
+    `cancelado` se consulta cada EVENTOS_POR_REVISION movimientos, también
+    mientras se arma el saldo inicial (que no produce filas).
+    """
+    cursor = conn.cursor()
+    motor = MotorCosteo(metodo)
+    corte = cargar_corte(cursor, motor, fecha_inicio, particion)
+    eventos = obtener_eventos(conn, corte, fecha_fin, particion)
+
+    # --- Eventos ANTES de fecha_inicio para inventario inicial ---
+    pendiente = None
+    ultima_fecha = corte
+    primero_en_rango = None
+    for n, ev in enumerate(eventos, 1):
+        if cancelado and n % EVENTOS_POR_REVISION == 0 and cancelado():
+            if guardar_cortes:
+                conn.commit()  # los cortes ya guardados son válidos
+            return
+        if ev.fecha >= fecha_inicio:
+            primero_en_rango = ev
+            break
+        if guardar_cortes and pendiente and ev.fecha > pendiente:
+            guardar_corte(cursor, motor, pendiente)
+            pendiente = None
+        cierre = fin_de_mes(ev.fecha)
+        if cierre < fecha_inicio:
+            pendiente = cierre
+        ultima_fecha = ev.fecha
+        motor.aplicar(ev)
+
+    if guardar_cortes:
+        if pendiente:
+            guardar_corte(cursor, motor, pendiente)
+        # El cierre del mes anterior sirve si no hubo movimientos entre él y fecha_inicio
+        cierre_anterior = fin_de_mes_anterior(fecha_inicio)
+        if ultima_fecha <= cierre_anterior and cierre_anterior > corte and cierre_anterior != pendiente:
+            guardar_corte(cursor, motor, cierre_anterior)
+        conn.commit()
+
+    # --- Eventos dentro del rango ---
+    if primero_en_rango is not None:
+        for n, ev in enumerate(chain((primero_en_rango,), eventos), 1):
+            if cancelado and n % EVENTOS_POR_REVISION == 0 and cancelado():
+                return
+            yield (0, ev.fecha, ev.tipo, ev.ref, ev.detalle), motor.filas_movimiento(ev)
+
+    completar_nombres(cursor, motor)
+    for pid in sorted(motor.productos()):
+        yield (1, pid), motor.filas_finales_producto(pid)
+
+
+# ================================
+# Kardex en paralelo por producto
+# ================================
+_cancelar_particiones = None  # multiprocessing.Event en cada proceso del pool
+
+
+def _iniciar_proceso(evento):
+    global _cancelar_particiones
+    _cancelar_particiones = evento
+
+
+def _kardex_particion(db_path, metodo, fecha_inicio, fecha_fin, particion, ruta):
+    """Trabajo de un proceso: kardex de los productos de una partición.
+
+    Abre su propia conexión de sólo lectura, así que no guarda cortes. Los
+    grupos de filas se van escribiendo en `ruta` (pickle, uno tras otro) para
+    no juntarlos en memoria. Si el llamador cancela, el archivo queda a
+    medias (se descarta).
+    """
+    cancelado = _cancelar_particiones.is_set if _cancelar_particiones is not None else None
+    conn = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        with open(ruta, "wb") as archivo:
+            for grupo in _recorrer_kardex(conn, metodo, fecha_inicio, fecha_fin, False, particion, cancelado):
+                pickle.dump(grupo, archivo, pickle.HIGHEST_PROTOCOL)
+    finally:
+        conn.close()
+
+
+def _leer_grupos(archivo):
+    """Grupos que escribió _kardex_particion, en el mismo orden."""
+    while True:
+        try:
+            yield pickle.load(archivo)
+        except EOFError:
+            return
+
+
+def generar_kardex_paralelo(db_path, metodo, fecha_inicio, fecha_fin, procesos=None, cancelado=None, avance=None):
+    """Mismas filas que generar_kardex, repartiendo los productos entre procesos.
+
+    El costeo de cada producto es independiente, así que cada proceso recorre
+    los movimientos de id_producto % procesos == i y los resultados se
+    intercalan por fecha/movimiento. Usa los cortes existentes pero no crea
+    nuevos. Se usa "spawn" porque el llamador puede tener hilos (Qt) activos.
+
+    Cada partición queda en un archivo temporal y el intercalado las lee a
+    la par, de a un movimiento, así que la memoria no crece con el tamaño
+    del kardex (el disco sí, mientras dura la generación). Las filas empiezan
+    a salir cuando termina la última partición.
+
+    Mientras esperan las particiones se consulta `cancelado()` (los procesos
+    lo ven por un Event y paran) y se llama `avance(terminadas, total)` al
+    terminar cada una.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    contexto = multiprocessing.get_context("spawn")
+    evento = contexto.Event()
+    with tempfile.TemporaryDirectory(prefix="kardex_") as directorio:
+        rutas = [os.path.join(directorio, f"particion_{i}.pickle") for i in range(procesos)]
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto,
+                                 initializer=_iniciar_proceso, initargs=(evento,)) as pool:
+            futuros = [
+                pool.submit(_kardex_particion, db_path, metodo, fecha_inicio, fecha_fin, (procesos, i), ruta)
+                for i, ruta in enumerate(rutas)
+            ]
+            pendientes = set(futuros)
+            while pendientes:
+                terminados, pendientes = wait(pendientes, timeout=ESPERA_PARTICIONES, return_when=FIRST_COMPLETED)
+                if cancelado and cancelado():
+                    evento.set()
+                    for futuro in pendientes:
+                        futuro.cancel()
+                    return
+                for futuro in terminados:
+                    futuro.result()  # un error en un proceso se propaga acá
+                if terminados and avance:
+                    avance(len(futuros) - len(pendientes), len(futuros))
+
+        # Los archivos se cierran antes de borrar el directorio (Windows no
+        # borra archivos abiertos), también si se deja de leer a mitad
+        with ExitStack() as archivos:
+            grupos = [_leer_grupos(archivos.enter_context(open(ruta, "rb"))) for ruta in rutas]
+            for _clave, filas in heapq.merge(*grupos, key=itemgetter(0)):
+                for fila in filas:
+                    yield fila
@@ -1,16 +1,239 @@
 import sqlite3
 import os
+import threading
+import atexit
+import weakref
+from contextlib import contextmanager
+
+import consultas
 
 DB_NAME = "sistema.db"
 
-def create_connection():
-    conn = sqlite3.connect(DB_NAME)
+# --- Ajustes de la conexión compartida ---
+CACHE_SENTENCIAS = 256              # sentencias preparadas que guarda cada conexión
+CACHE_PAGINAS_KIB = 16 * 1024       # PRAGMA cache_size (en KiB)
+MMAP_BYTES = 128 * 1024 * 1024      # PRAGMA mmap_size
+
+_local = threading.local()
+# Referencias débiles: la conexión de un hilo que termina se libera (y SQLite
+# la cierra) junto con su threading.local, sin quedar retenida acá.
+_conexiones = weakref.WeakSet()
+_conexiones_lock = threading.Lock()
+
+
+class _Conexion:
+    """Conexión de un hilo; envuelta porque sqlite3.Connection no admite weakref."""
+    __slots__ = ("conn", "db_name", "__weakref__")
+
+    def __init__(self, conn, db_name):
+        self.conn = conn
+        self.db_name = db_name
+
+
+def _configurar_conexion(conn):
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_PAGINAS_KIB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    # Borrar una venta, compra o liberación arrastra sus filas hijas (ON DELETE CASCADE)
+    conn.execute("PRAGMA foreign_keys=ON")
+
+
+def get_connection():
+    """Devuelve la conexión del hilo actual, abriéndola la primera vez.
+
+    La conexión queda abierta y se reutiliza en todas las ventanas del mismo
+    hilo, así que quien la pide no debe cerrarla.
+    """
+    actual = getattr(_local, "conexion", None)
+    if actual is not None and actual.db_name == DB_NAME:
+        return actual.conn
+    if actual is not None:
+        close_connection()
+
+    # Cada conexión la usa sólo su hilo; check_same_thread=False deja que
+    # _cerrar_conexiones las cierre desde el hilo principal al salir.
+    conn = sqlite3.connect(DB_NAME, cached_statements=CACHE_SENTENCIAS, check_same_thread=False)
+    _configurar_conexion(conn)
+    _local.conexion = _Conexion(conn, DB_NAME)
+    with _conexiones_lock:
+        _conexiones.add(_local.conexion)
     return conn
 
-def initialize_db():
-    conn = create_connection()
+
+def close_connection():
+    """Cierra la conexión del hilo actual (si existe).
+
+    Los hilos de trabajo deben llamarla al terminar, para no esperar a que
+    el recolector libere la conexión.
+    """
+    actual = getattr(_local, "conexion", None)
+    if actual is None:
+        return
+    _local.conexion = None
+    with _conexiones_lock:
+        _conexiones.discard(actual)
+    actual.conn.close()
+
+
+@contextmanager
+def transaccion(conn=None):
+    """Bloque de escritura atómico: BEGIN IMMEDIATE ... COMMIT (o ROLLBACK si falla).
+
+    IMMEDIATE toma el candado de escritura al empezar, así dos usuarios que
+    registran al mismo tiempo no se pisan a mitad de la operación.
+    """
+    conn = conn or get_connection()
     cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        yield cursor
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def siguiente_id(cursor, tabla, columna):
+    """Primer id libre de una tabla AUTOINCREMENT, para insertar con id explícito.
+
+    Sólo es seguro dentro de transaccion(): el candado de escritura impide
+    que otro proceso tome los mismos ids mientras tanto.
+    """
+    cursor.execute(f"SELECT MAX({columna}) FROM {tabla}")
+    maximo = cursor.fetchone()[0] or 0
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (tabla,))
+    fila = cursor.fetchone()
+    return max(maximo, fila[0] if fila else 0) + 1
 
+
+IDS_POR_CONSULTA = 500
+
+
+def consultar_por_bloques(cursor, sql, ids, *parametros):
+    """Filas de `sql` para todos los `ids`, consultando de a IDS_POR_CONSULTA.
+
+    `sql` lleva {marcadores} donde va la lista del IN y `parametros` son
+    los que siguen a esa lista. SQLite limita la cantidad de parámetros por
+    consulta, así que una lista larga se parte en varias.
+    """
+    ids = list(ids)
+    for i in range(0, len(ids), IDS_POR_CONSULTA):
+        bloque = ids[i:i + IDS_POR_CONSULTA]
+        cursor.execute(sql.format(marcadores=",".join("?" * len(bloque))), (*bloque, *parametros))
+        yield from cursor.fetchall()
+
+
+@atexit.register
+def _cerrar_conexiones():
+    # Al salir se cierran todas para que SQLite haga checkpoint del WAL
+    with _conexiones_lock:
+        pendientes = list(_conexiones)
+        _conexiones.clear()
+    for actual in pendientes:
+        actual.conn.close()
+
+
+# --- Índices secundarios ---
+# (nombre, tabla, columnas). Cubren las claves foráneas y las columnas de
+# fecha por las que filtran la liberación, el kardex y los historiales.
+INDICES = [
+    ("idx_inventarios_producto_fecha", "inventarios", "id_producto, fecha_compra"),
+    ("idx_inventarios_fecha", "inventarios", "fecha_compra, id"),
+    ("idx_inventarios_compra", "inventarios", "id_compra"),
+    ("idx_compras_fecha", "compras", "fecha, id_compra"),
+    ("idx_ventas_fecha", "ventas", "fecha, id_venta"),
+    ("idx_detalle_compras_compra", "detalle_compras", "id_compra"),
+    ("idx_detalle_compras_producto", "detalle_compras", "id_producto"),
+    ("idx_detalle_ventas_venta", "detalle_ventas", "id_venta"),
+    ("idx_detalle_ventas_producto", "detalle_ventas", "id_producto"),
+    ("idx_liberaciones_venta", "liberaciones", "id_venta"),
+    ("idx_liberacion_inventarios_liberacion", "liberacion_inventarios", "id_liberacion"),
+    ("idx_liberacion_inventarios_inventario", "liberacion_inventarios", "id_inventario"),
+]
+
+# Consultas frecuentes y el índice que cada una debe usar según EXPLAIN QUERY PLAN.
+# El SQL es el mismo que ejecutan los módulos (consultas.py), no una copia.
+# (descripción, sql, parámetros, índices esperados)
+_PAGINA = ("2025-01-01", "2025-01-31", "2025-01-01", "2025-01-01", 1, 1, 200)
+CONSULTAS_CRITICAS = [
+    ("Lotes abiertos de los productos de una venta",
+     consultas.LOTES_ABIERTOS.format(marcadores="?,?"),
+     (1, 2, "2025-01-01"), ["idx_inventarios_producto_fecha"]),
+    ("Lotes abiertos de un producto (vista previa)",
+     consultas.LOTES_DE_PRODUCTO,
+     (1,), ["idx_inventarios_producto_fecha"]),
+    ("Lotes abiertos hasta una fecha (liberar pendientes)",
+     consultas.LOTES_ABIERTOS_HASTA,
+     ("2025-01-01",), ["idx_inventarios_fecha"]),
+    ("Ventas pendientes de liberar",
+     consultas.VENTAS_PENDIENTES,
+     ("2025-01-01",), ["idx_ventas_fecha", "idx_liberaciones_venta", "idx_detalle_ventas_venta"]),
+    ("Movimientos del kardex (compras y ventas)",
+     consultas.MOVIMIENTOS_KARDEX.format(filtro_compras="", filtro_ventas=""),
+     (0, "", "2025-01-01", 1, "", "2025-01-01"),
+     ["idx_inventarios_fecha", "idx_ventas_fecha", "idx_detalle_ventas_venta"]),
+    ("Detalle de una venta",
+     consultas.DETALLE_VENTA,
+     (1,), ["idx_detalle_ventas_venta"]),
+    ("Liberación existente de una venta",
+     consultas.LIBERACION_DE_VENTA,
+     (1,), ["idx_liberaciones_venta"]),
+    ("Devolver los lotes de una liberación",
+     consultas.DEVOLVER_LOTES.format(filtro=consultas.FILTRO_LIBERACION),
+     (1, 1), ["idx_liberacion_inventarios_liberacion", "idx_liberacion_inventarios_inventario"]),
+    ("Devolver los lotes de una venta",
+     consultas.DEVOLVER_LOTES.format(filtro=consultas.FILTRO_LIBERACIONES_VENTA),
+     (1, 1), ["idx_liberaciones_venta", "idx_liberacion_inventarios_liberacion",
+              "idx_liberacion_inventarios_inventario"]),
+    ("Stock devuelto al borrar una venta",
+     consultas.DEVOLVER_STOCK_VENTA,
+     (1, 1), ["idx_detalle_ventas_venta"]),
+    ("Stock quitado al borrar una compra",
+     consultas.QUITAR_STOCK_COMPRA,
+     (1, 1), ["idx_detalle_compras_compra"]),
+    ("Inventario por período (página)",
+     consultas.sql_pagina(["i.id"], consultas.INVENTARIO_DESDE, consultas.INVENTARIO_CLAVES,
+                          ["c.fecha BETWEEN ? AND ?"], True),
+     _PAGINA, ["idx_compras_fecha", "idx_inventarios_compra"]),
+    ("Compras de un mes (página)",
+     consultas.sql_pagina(["p.nombre"], consultas.HISTORIAL_COMPRAS_DESDE, consultas.HISTORIAL_COMPRAS_CLAVES,
+                          ["c.fecha >= ? AND c.fecha < ?"], True),
+     _PAGINA, ["idx_compras_fecha", "idx_detalle_compras_compra"]),
+    ("Historial de ventas (página)",
+     consultas.sql_pagina(["p.nombre"], consultas.HISTORIAL_VENTAS_DESDE, consultas.HISTORIAL_VENTAS_CLAVES,
+                          [], True),
+     (1, 1, 1, 200), ["idx_detalle_ventas_venta"]),
+]
+
+
+def crear_indices(cursor):
+    for nombre, tabla, columnas in INDICES:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({columnas})")
+
+
+def verificar_indices(conn=None):
+    """Revisa el plan de cada consulta crítica.
+
+    Devuelve una lista de (descripción, plan) con las consultas que no usan
+    los índices esperados o que ordenan todo el resultado aparte (TEMP
+    B-TREE FOR ORDER BY); vacía si todo está bien.
+    """
+    conn = conn or get_connection()
+    fallos = []
+    for descripcion, sql, params, esperados in CONSULTAS_CRITICAS:
+        plan = "\n".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+        ordena_aparte = "TEMP B-TREE FOR ORDER BY" in plan
+        if ordena_aparte or not all(f"INDEX {indice}" in plan for indice in esperados):
+            fallos.append((descripcion, plan))
+    return fallos
+
+
+# =========================
+# MIGRACIONES
+# =========================
+def _migracion_esquema_base(cursor):
     # --- Tabla de Roles ---
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS roles (
@@ -148,7 +371,215 @@ def initialize_db():
             FOREIGN KEY (id_inventario) REFERENCES inventarios(id)
         );
     """)
-    
+
+
+def _migracion_indices(cursor):
+    crear_indices(cursor)
+
+
+def _migracion_cantidad_liberaciones(cursor):
+    # Algunas bases antiguas ya traen la columna
+    cursor.execute("PRAGMA table_info(liberaciones)")
+    if "cantidad" not in [r[1] for r in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE liberaciones ADD COLUMN cantidad INTEGER NOT NULL DEFAULT 0")
+
+
+# Disparadores que borran los cortes del kardex afectados por un movimiento
+# (nombre, evento, expresión con la fecha más antigua afectada). '' borra todo.
+TRIGGERS_KARDEX = [
+    ("trg_kardex_inventarios_ins", "AFTER INSERT ON inventarios", "NEW.fecha_compra"),
+    ("trg_kardex_inventarios_del", "AFTER DELETE ON inventarios", "OLD.fecha_compra"),
+    ("trg_kardex_inventarios_upd",
+     "AFTER UPDATE OF id_producto, cantidad, precio_unitario, fecha_compra ON inventarios",
+     "MIN(OLD.fecha_compra, NEW.fecha_compra)"),
+    ("trg_kardex_detalle_ventas_ins", "AFTER INSERT ON detalle_ventas",
+     "COALESCE((SELECT fecha FROM ventas WHERE id_venta = NEW.id_venta), '')"),
+    # Sin la venta (borrado en cascada) no se invalida nada: ya lo hizo trg_kardex_ventas_del
+    ("trg_kardex_detalle_ventas_del", "AFTER DELETE ON detalle_ventas",
+     "COALESCE((SELECT fecha FROM ventas WHERE id_venta = OLD.id_venta), '9999-12-31')"),
+    ("trg_kardex_detalle_ventas_upd", "AFTER UPDATE ON detalle_ventas",
+     "COALESCE(MIN((SELECT fecha FROM ventas WHERE id_venta = OLD.id_venta),"
+     " (SELECT fecha FROM ventas WHERE id_venta = NEW.id_venta)), '')"),
+    ("trg_kardex_ventas_del", "AFTER DELETE ON ventas", "OLD.fecha"),
+    ("trg_kardex_ventas_upd", "AFTER UPDATE OF fecha ON ventas", "MIN(OLD.fecha, NEW.fecha)"),
+]
+
+
+def crear_triggers_kardex(cursor):
+    for nombre, evento, desde in TRIGGERS_KARDEX:
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {nombre} {evento}
+            BEGIN
+                DELETE FROM kardex_cortes WHERE fecha_corte >= {desde};
+                DELETE FROM kardex_snapshots WHERE fecha_corte >= {desde};
+            END
+        """)
+
+
+def _migracion_snapshots_kardex(cursor):
+    # Un corte es el estado de costeo de los productos al cierre de un mes,
+    # para un método: lotes vivos (PEPS/UEPS) o cantidad y promedio (PMP).
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS kardex_cortes (
+            metodo TEXT NOT NULL,
+            fecha_corte TEXT NOT NULL,
+            PRIMARY KEY (metodo, fecha_corte)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS kardex_snapshots (
+            metodo TEXT NOT NULL,
+            fecha_corte TEXT NOT NULL,
+            id_producto INTEGER NOT NULL,
+            cantidad INTEGER NOT NULL,
+            precio_prom REAL NOT NULL DEFAULT 0,
+            lotes TEXT,
+            PRIMARY KEY (metodo, fecha_corte, id_producto)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_kardex_cortes_fecha ON kardex_cortes (fecha_corte)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_kardex_snapshots_fecha ON kardex_snapshots (fecha_corte)")
+    crear_triggers_kardex(cursor)
+
+
+def _migracion_stock_neto(cursor):
+    # Antes las ventas no descontaban stock: se recalcula como comprado - vendido
+    cursor.execute("""
+        UPDATE productos SET stock =
+            COALESCE((SELECT SUM(cantidad) FROM detalle_compras d WHERE d.id_producto = productos.id_producto), 0)
+          - COALESCE((SELECT SUM(cantidad) FROM detalle_ventas d WHERE d.id_producto = productos.id_producto), 0)
+    """)
+
+
+# Tablas hijas reconstruidas con ON DELETE CASCADE hacia su documento. Un lote
+# liberado no se puede borrar (liberacion_inventarios lo sigue apuntando).
+TABLAS_CASCADA = [
+    ("detalle_ventas", """
+        id_detalle INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_venta INTEGER NOT NULL,
+        id_producto INTEGER NOT NULL,
+        cantidad INTEGER NOT NULL,
+        precio_unitario REAL NOT NULL,
+        FOREIGN KEY (id_venta) REFERENCES ventas(id_venta) ON DELETE CASCADE,
+        FOREIGN KEY (id_producto) REFERENCES productos(id_producto)
+    """),
+    ("detalle_compras", """
+        id_detalle INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_compra INTEGER NOT NULL,
+        id_producto INTEGER NOT NULL,
+        cantidad INTEGER NOT NULL,
+        precio_unitario REAL NOT NULL,
+        FOREIGN KEY (id_compra) REFERENCES compras(id_compra) ON DELETE CASCADE,
+        FOREIGN KEY (id_producto) REFERENCES productos(id_producto)
+    """),
+    ("inventarios", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_producto INTEGER NOT NULL,
+        cantidad INTEGER NOT NULL,
+        precio_unitario REAL NOT NULL,
+        fecha_compra TEXT NOT NULL,
+        id_compra INTEGER NOT NULL,
+        FOREIGN KEY (id_producto) REFERENCES productos(id_producto),
+        FOREIGN KEY (id_compra) REFERENCES compras(id_compra) ON DELETE CASCADE
+    """),
+    ("liberaciones", """
+        id_liberacion INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_venta INTEGER NOT NULL,
+        total REAL NOT NULL,
+        fecha TEXT NOT NULL,
+        cantidad INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (id_venta) REFERENCES ventas(id_venta) ON DELETE CASCADE
+    """),
+    ("liberacion_inventarios", """
+        id_relacion INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_liberacion INTEGER NOT NULL,
+        id_inventario INTEGER NOT NULL,
+        cantidad INTEGER NOT NULL,
+        total REAL NOT NULL,
+        FOREIGN KEY (id_liberacion) REFERENCES liberaciones(id_liberacion) ON DELETE CASCADE,
+        FOREIGN KEY (id_inventario) REFERENCES inventarios(id)
+    """),
+]
+
+
+def _reconstruir_tabla(cursor, tabla, definicion):
+    # SQLite no permite cambiar una clave foránea: se copia a una tabla nueva
+    cursor.execute(f"PRAGMA table_info({tabla})")
+    anteriores = {r[1] for r in cursor.fetchall()}
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (tabla,))
+    fila = cursor.fetchone()
+    cursor.execute(f"CREATE TABLE {tabla}_nueva ({definicion})")
+    cursor.execute(f"PRAGMA table_info({tabla}_nueva)")
+    columnas = ", ".join(r[1] for r in cursor.fetchall() if r[1] in anteriores)
+    cursor.execute(f"INSERT INTO {tabla}_nueva ({columnas}) SELECT {columnas} FROM {tabla}")
+    cursor.execute(f"DROP TABLE {tabla}")
+    cursor.execute(f"ALTER TABLE {tabla}_nueva RENAME TO {tabla}")
+    if fila:
+        # Conserva el contador de AUTOINCREMENT aunque se hayan borrado los últimos ids
+        cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (fila[0], tabla))
+
+
+def _migracion_borrado_en_cascada(cursor):
+    for tabla, definicion in TABLAS_CASCADA:
+        _reconstruir_tabla(cursor, tabla, definicion)
+    # DROP TABLE se lleva los índices y disparadores de cada tabla
+    crear_indices(cursor)
+    crear_triggers_kardex(cursor)
+
+
+
+def _migracion_trigger_detalle_ventas(cursor):
+    # CREATE TRIGGER IF NOT EXISTS no reemplaza la versión que borraba todos los cortes
+    cursor.execute("DROP TRIGGER IF EXISTS trg_kardex_detalle_ventas_del")
+    crear_triggers_kardex(cursor)
+
+
+# (versión, descripción, función). Se aplican en orden una sola vez y la
+# versión alcanzada queda guardada en PRAGMA user_version. Los cambios de
+# esquema nuevos se agregan al final con la siguiente versión.
+MIGRACIONES = [
+    (1, "Esquema base", _migracion_esquema_base),
+    (2, "Índices secundarios", _migracion_indices),
+    (3, "Columna cantidad en liberaciones", _migracion_cantidad_liberaciones),
+    (4, "Cortes mensuales del kardex", _migracion_snapshots_kardex),
+    (5, "Stock neto de ventas", _migracion_stock_neto),
+    (6, "Borrado en cascada de documentos", _migracion_borrado_en_cascada),
+    (7, "Cortes del kardex y borrado en cascada", _migracion_trigger_detalle_ventas),
+]
+
+ESQUEMA_VERSION = MIGRACIONES[-1][0]
+
+
+def version_esquema(conn=None):
+    conn = conn or get_connection()
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def aplicar_migraciones(conn=None):
+    """Lleva la base a ESQUEMA_VERSION. Devuelve las versiones aplicadas."""
+    conn = conn or get_connection()
+    actual = version_esquema(conn)
+    aplicadas = []
+    # Las reconstrucciones de tablas necesitan las claves foráneas apagadas,
+    # y el PRAGMA no tiene efecto dentro de una transacción
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        for version, descripcion, migracion in MIGRACIONES:
+            if version <= actual:
+                continue
+            with transaccion(conn) as cursor:
+                migracion(cursor)
+                cursor.execute(f"PRAGMA user_version = {version}")
+            aplicadas.append(version)
+    finally:
+        conn.execute("PRAGMA foreign_keys=ON")
+    return aplicadas
+
+
+def initialize_db():
+    conn = get_connection()
+    aplicar_migraciones(conn)
+    cursor = conn.cursor()
 
     # Insertar roles si no existen
     roles = ["Administrador", "Usuario", "Invitado"]
@@ -167,10 +598,9 @@ def initialize_db():
         """, ("ADMIN", "UMG2025", admin_role_id))
 
     conn.commit()
-    conn.close()
 
 def login(username, password):
-    conn = create_connection()
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("""
         SELECT username, roles.nombre
@@ -179,28 +609,44 @@ def login(username, password):
         WHERE username = ? AND password = ?
     """, (username, password))
     result = cursor.fetchone()
-    conn.close()
     return result
 
+def id_usuario(username):
+    """Id del usuario con ese nombre, o None si no existe."""
+    fila = get_connection().execute("SELECT id FROM usuarios WHERE username = ?", (username,)).fetchone()
+    return fila[0] if fila else None
+
+
+def exigir_usuario(cursor, usuario_id):
+    """Lanza ValueError si el usuario no existe (compras y ventas lo referencian)."""
+    if cursor.execute("SELECT 1 FROM usuarios WHERE id = ?", (usuario_id,)).fetchone() is None:
+        raise ValueError(f"El usuario #{usuario_id} no existe.")
+
+
 def crear_usuario(username, password, rol_id):
-    conn = create_connection()
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(
         "INSERT INTO usuarios (username, password, role_id) VALUES (?, ?, ?)",
         (username, password, rol_id)
     )
     conn.commit()
-    conn.close()
 
 def obtener_roles():
-    conn = create_connection()
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT id, nombre FROM roles")
     roles = cursor.fetchall()
-    conn.close()
     return roles
 
 
 if __name__ == "__main__":
+    import sys
     initialize_db()
     print("Base de datos inicializada correctamente.")
+    if "--verificar-indices" in sys.argv:
+        fallos = verificar_indices()
+        for descripcion, plan in fallos:
+            print(f"[SIN ÍNDICE] {descripcion}\n{plan}\n")
+        print(f"{len(CONSULTAS_CRITICAS) - len(fallos)}/{len(CONSULTAS_CRITICAS)} consultas usan sus índices.")
+        sys.exit(1 if fallos else 0)
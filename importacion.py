@@ -0,0 +1,357 @@
+"""Importación masiva de productos, compras y ventas desde CSV o Excel (sin Qt).
+
+El archivo se lee por partes; cada fila se valida y los nombres de producto,
+cliente y proveedor se resuelven con diccionarios cargados una sola vez.
+Las filas válidas se insertan con executemany en transacciones de
+TAMANO_LOTE filas; las inválidas se informan con su número de fila y no
+detienen la importación.
+
+Columnas (la primera fila del archivo; no importan mayúsculas ni el orden):
+    productos: nombre, precio [, proveedor, stock]
+    compras:   fecha, producto, cantidad [, precio_unitario, proveedor, numero]
+    ventas:    fecha, producto, cantidad, precio_unitario [, cliente, numero]
+
+En compras y ventas, las filas seguidas con el mismo `numero` forman un
+solo documento; sin `numero`, cada fila es un documento. Si una línea de un
+documento es inválida, se omite el documento completo. Las ventas
+importadas descuentan stock pero no se rechazan por falta de stock: son
+historia ya ocurrida. Las compras y ventas quedan a nombre de `usuario_id`,
+que debe existir.
+"""
+import csv
+import datetime
+import os
+import sqlite3
+from itertools import groupby
+
+import database as db
+
+TAMANO_LOTE = 5000
+
+
+class ResultadoImportacion:
+    __slots__ = ("insertados", "errores")
+
+    def __init__(self):
+        self.insertados = 0
+        self.errores = []  # [(número de fila, mensaje)]
+
+    def error(self, fila, mensaje):
+        self.errores.append((fila, mensaje))
+
+
+class ErrorFila(ValueError):
+    pass
+
+
+# ================================
+# Lectura de archivos
+# ================================
+def leer_filas(ruta):
+    """(número de fila, {columna: valor}) de un .csv o .xlsx, sin cargarlo entero."""
+    if os.path.splitext(ruta)[1].lower() in (".xlsx", ".xlsm"):
+        yield from _leer_excel(ruta)
+        return
+    with open(ruta, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        encabezados = None
+        for numero, valores in enumerate(reader, start=1):
+            if encabezados is None:
+                encabezados = _normalizar_encabezados(valores)
+                continue
+            if any(str(v).strip() for v in valores):
+                yield numero, dict(zip(encabezados, valores))
+
+
+def _leer_excel(ruta):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        encabezados = None
+        for numero, valores in enumerate(wb.active.iter_rows(values_only=True), start=1):
+            if encabezados is None:
+                encabezados = _normalizar_encabezados(valores)
+                continue
+            if any(v not in (None, "") for v in valores):
+                yield numero, dict(zip(encabezados, valores))
+    finally:
+        wb.close()
+
+
+def _normalizar_encabezados(valores):
+    return [str(v or "").strip().lower().replace(" ", "_") for v in valores]
+
+
+def _lotes(iterable, tamano, peso=lambda _: 1):
+    """Agrupa en listas de ~`tamano` (según `peso` de cada elemento)."""
+    lote, acumulado = [], 0
+    for elemento in iterable:
+        lote.append(elemento)
+        acumulado += peso(elemento)
+        if acumulado >= tamano:
+            yield lote
+            lote, acumulado = [], 0
+    if lote:
+        yield lote
+
+
+# ================================
+# Validación de campos
+# ================================
+def _clave(nombre):
+    return str(nombre).strip().lower()
+
+
+def _texto(fila, columna, requerido=True):
+    valor = fila.get(columna)
+    valor = "" if valor is None else str(valor).strip()
+    if requerido and not valor:
+        raise ErrorFila(f"falta '{columna}'")
+    return valor
+
+
+def _fecha(fila):
+    valor = fila.get("fecha")
+    if isinstance(valor, datetime.datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, datetime.date):
+        return valor.isoformat()
+    texto = _texto(fila, "fecha")
+    try:
+        return datetime.date.fromisoformat(texto[:10]).isoformat()
+    except ValueError:
+        raise ErrorFila(f"fecha inválida '{texto}' (se espera AAAA-MM-DD)")
+
+
+def _entero(fila, columna, minimo=1, requerido=True):
+    texto = _texto(fila, columna, requerido)
+    if not texto:
+        return None
+    try:
+        valor = float(texto)
+    except ValueError:
+        raise ErrorFila(f"'{columna}' no es un número: {texto}")
+    if valor < minimo or valor != int(valor):
+        raise ErrorFila(f"'{columna}' debe ser un entero mayor o igual a {minimo}: {texto}")
+    return int(valor)
+
+
+def _precio(fila, columna, requerido=True):
+    texto = _texto(fila, columna, requerido)
+    if not texto:
+        return None
+    try:
+        valor = float(texto)
+    except ValueError:
+        raise ErrorFila(f"'{columna}' no es un número: {texto}")
+    if valor < 0:
+        raise ErrorFila(f"'{columna}' no puede ser negativo: {texto}")
+    return valor
+
+
+def _buscar(tabla_ids, fila, columna, requerido=True):
+    nombre = _texto(fila, columna, requerido)
+    if not nombre:
+        return None
+    try:
+        return tabla_ids[_clave(nombre)]
+    except KeyError:
+        raise ErrorFila(f"{columna} desconocido: {nombre}")
+
+
+def _ids_por_nombre(cursor, sql):
+    """{nombre normalizado: id}; con nombres repetidos gana el id menor."""
+    ids = {}
+    for id_, nombre in cursor.execute(sql).fetchall():
+        ids.setdefault(_clave(nombre), id_)
+    return ids
+
+
+def _documentos(filas):
+    """Agrupa filas seguidas con el mismo 'numero'; sin número, cada fila va sola."""
+    for _numero, grupo in groupby(filas, key=lambda f: _clave(f[1].get("numero") or "") or object()):
+        yield list(grupo)
+
+
+# ================================
+# Importadores
+# ================================
+def importar_productos(ruta, conn=None):
+    conn = conn or db.get_connection()
+    resultado = ResultadoImportacion()
+    cursor = conn.cursor()
+    productos = _ids_por_nombre(cursor, "SELECT id_producto, nombre FROM productos ORDER BY id_producto")
+    proveedores = _ids_por_nombre(cursor, "SELECT id_proveedor, nombre FROM proveedores ORDER BY id_proveedor")
+
+    for lote in _lotes(leer_filas(ruta), TAMANO_LOTE):
+        nuevos = []
+        for numero, fila in lote:
+            try:
+                nombre = _texto(fila, "nombre")
+                if _clave(nombre) in productos:
+                    raise ErrorFila(f"el producto ya existe: {nombre}")
+                precio = _precio(fila, "precio")
+                proveedor_id = _buscar(proveedores, fila, "proveedor", requerido=False)
+                stock = _entero(fila, "stock", minimo=0, requerido=False) or 0
+            except ErrorFila as e:
+                resultado.error(numero, str(e))
+                continue
+            productos[_clave(nombre)] = None  # reservado: detecta repetidos en el mismo archivo
+            nuevos.append((nombre, proveedor_id, precio, stock))
+
+        if not nuevos:
+            continue
+        with db.transaccion(conn) as cursor:
+            siguiente = db.siguiente_id(cursor, "productos", "id_producto")
+            filas = [(siguiente + i,) + datos for i, datos in enumerate(nuevos)]
+            cursor.executemany(
+                "INSERT INTO productos (id_producto, nombre, proveedor_id, precio, stock) VALUES (?, ?, ?, ?, ?)",
+                filas
+            )
+        for id_producto, nombre, *_ in filas:
+            productos[_clave(nombre)] = id_producto
+        resultado.insertados += len(filas)
+    return resultado
+
+
+def _importar_documentos(ruta, conn, encabezado, linea, escribir):
+    """Recorre compras o ventas por documento y las escribe por lotes.
+
+    `encabezado(fila)` lee de la primera fila (fecha, tercero), `linea(fila)`
+    lee cada línea (id_producto, cantidad, precio) y `escribir(cursor,
+    documentos)` inserta [(fecha, tercero, lineas)] y devuelve cuántas
+    líneas escribió. La fila que falla lleva el mensaje del error; las
+    demás filas de su documento, una referencia a ella. Si la base rechaza
+    un lote (IntegrityError) se lanza ValueError; los lotes anteriores
+    quedan guardados.
+    """
+    conn = conn or db.get_connection()
+    resultado = ResultadoImportacion()
+    for lote in _lotes(_documentos(leer_filas(ruta)), TAMANO_LOTE, peso=len):
+        documentos = []
+        for documento in lote:
+            numero = documento[0][0]
+            try:
+                fecha, tercero = encabezado(documento[0][1])
+                lineas = []
+                for numero, fila in documento:
+                    lineas.append(linea(fila))
+            except ErrorFila as e:
+                # Todo el documento se descarta
+                for otra, _ in documento:
+                    mensaje = str(e) if otra == numero else f"documento omitido por el error de la fila {numero}"
+                    resultado.error(otra, mensaje)
+                continue
+            documentos.append((fecha, tercero, lineas))
+
+        if not documentos:
+            continue
+        try:
+            with db.transaccion(conn) as cursor:
+                resultado.insertados += escribir(cursor, documentos)
+        except sqlite3.IntegrityError as e:
+            raise ValueError(
+                f"No se pudo escribir el lote desde la fila {lote[0][0][0]} "
+                f"({resultado.insertados} líneas ya importadas): {e}"
+            ) from e
+    return resultado
+
+
+def importar_compras(ruta, conn=None, usuario_id=1):
+    cursor = (conn or db.get_connection()).cursor()
+    db.exigir_usuario(cursor, usuario_id)
+    productos = _ids_por_nombre(cursor, "SELECT id_producto, nombre FROM productos ORDER BY id_producto")
+    precios = dict(cursor.execute("SELECT id_producto, precio FROM productos").fetchall())
+    proveedores = _ids_por_nombre(cursor, "SELECT id_proveedor, nombre FROM proveedores ORDER BY id_proveedor")
+
+    def encabezado(fila):
+        return _fecha(fila), _buscar(proveedores, fila, "proveedor", requerido=False)
+
+    def linea(fila):
+        pid = _buscar(productos, fila, "producto")
+        cantidad = _entero(fila, "cantidad")
+        precio = _precio(fila, "precio_unitario", requerido=False)
+        return pid, cantidad, precios[pid] if precio is None else precio
+
+    def escribir(cursor, compras):
+        siguiente = db.siguiente_id(cursor, "compras", "id_compra")
+        encabezados, detalle, inventario, stock = [], [], [], {}
+        for i, (fecha, proveedor_id, lineas) in enumerate(compras):
+            id_compra = siguiente + i
+            encabezados.append((id_compra, fecha, usuario_id, proveedor_id,
+                                sum(cantidad * precio for _, cantidad, precio in lineas)))
+            for pid, cantidad, precio in lineas:
+                detalle.append((id_compra, pid, cantidad, precio))
+                inventario.append((pid, cantidad, precio, fecha, id_compra))
+                stock[pid] = stock.get(pid, 0) + cantidad
+        cursor.executemany(
+            "INSERT INTO compras (id_compra, fecha, usuario_id, proveedor_id, total) VALUES (?, ?, ?, ?, ?)",
+            encabezados
+        )
+        cursor.executemany(
+            "INSERT INTO detalle_compras (id_compra, id_producto, cantidad, precio_unitario) VALUES (?, ?, ?, ?)",
+            detalle
+        )
+        cursor.executemany(
+            "INSERT INTO inventarios (id_producto, cantidad, precio_unitario, fecha_compra, id_compra) VALUES (?, ?, ?, ?, ?)",
+            inventario
+        )
+        cursor.executemany(
+            "UPDATE productos SET stock = stock + ? WHERE id_producto = ?",
+            [(cantidad, pid) for pid, cantidad in stock.items()]
+        )
+        return len(detalle)
+
+    return _importar_documentos(ruta, conn, encabezado, linea, escribir)
+
+
+def importar_ventas(ruta, conn=None, usuario_id=1):
+    cursor = (conn or db.get_connection()).cursor()
+    db.exigir_usuario(cursor, usuario_id)
+    productos = _ids_por_nombre(cursor, "SELECT id_producto, nombre FROM productos ORDER BY id_producto")
+    clientes = _ids_por_nombre(cursor, "SELECT id_cliente, nombre FROM clientes ORDER BY id_cliente")
+
+    def encabezado(fila):
+        return _fecha(fila), _buscar(clientes, fila, "cliente", requerido=False)
+
+    def linea(fila):
+        pid = _buscar(productos, fila, "producto")
+        cantidad = _entero(fila, "cantidad")
+        precio = _precio(fila, "precio_unitario")
+        if precio <= 0:
+            raise ErrorFila("'precio_unitario' debe ser mayor que cero")
+        return pid, cantidad, precio
+
+    def escribir(cursor, ventas):
+        siguiente = db.siguiente_id(cursor, "ventas", "id_venta")
+        encabezados, detalle, stock = [], [], {}
+        for i, (fecha, cliente_id, lineas) in enumerate(ventas):
+            id_venta = siguiente + i
+            encabezados.append((id_venta, fecha, cliente_id, usuario_id,
+                                sum(cantidad * precio for _, cantidad, precio in lineas)))
+            for pid, cantidad, precio in lineas:
+                detalle.append((id_venta, pid, cantidad, precio))
+                stock[pid] = stock.get(pid, 0) + cantidad
+        cursor.executemany(
+            "INSERT INTO ventas (id_venta, fecha, cliente_id, usuario_id, total) VALUES (?, ?, ?, ?, ?)",
+            encabezados
+        )
+        cursor.executemany(
+            "INSERT INTO detalle_ventas (id_venta, id_producto, cantidad, precio_unitario) VALUES (?, ?, ?, ?)",
+            detalle
+        )
+        cursor.executemany(
+            "UPDATE productos SET stock = stock - ? WHERE id_producto = ?",
+            [(cantidad, pid) for pid, cantidad in stock.items()]
+        )
+        return len(detalle)
+
+    return _importar_documentos(ruta, conn, encabezado, linea, escribir)
+
+
+IMPORTADORES = {
+    "productos": importar_productos,
+    "compras": importar_compras,
+    "ventas": importar_ventas,
+}
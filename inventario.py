@@ -2,12 +2,14 @@ import sys
 import os
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QLabel, QComboBox, QDateEdit,
-    QPushButton, QTableWidget, QTableWidgetItem, QVBoxLayout, QHBoxLayout, QMessageBox
+    QPushButton, QTableView, QAbstractItemView, QVBoxLayout, QHBoxLayout, QMessageBox
 )
 from PyQt6.QtGui import QIcon
 from PyQt6.QtCore import QDate
-import sqlite3
+import consultas
 import database as db
+from modelos import Columna, DelegadoBoton, ModeloPaginado
+from servicio_compras import eliminar_compra
 
 def resource_path(relative_path):
     """Obtiene la ruta absoluta del recurso, compatible con PyInstaller."""
@@ -63,68 +65,54 @@ class InventarioWindow(QMainWindow):
         # ======================
         # TABLA DE INVENTARIO
         # ======================
-        self.inventario_table = QTableWidget()
-        self.inventario_table.setColumnCount(6 if self.role == "administrador" else 5)
-        headers = ["ID Inventario", "Producto", "Cantidad", "Precio Unitario", "Fecha Compra"]
+        columnas = [
+            Columna("ID Inventario", "i.id"),
+            Columna("Producto", "p.nombre"),
+            Columna("Cantidad", "i.cantidad"),
+            Columna("Precio Unitario", "i.precio_unitario", lambda precio: f"{precio:.2f}"),
+            Columna("Fecha Compra", "c.fecha"),
+        ]
         if self.role == "administrador":
-            headers.append("Eliminar")
-        self.inventario_table.setHorizontalHeaderLabels(headers)
+            # El botón lo pinta el delegado; la compra sale de la clave c.id_compra
+            columnas.append(Columna("Eliminar", "NULL", lambda _: ""))
+        self.inventario_model = ModeloPaginado(
+            columnas,
+            consultas.INVENTARIO_DESDE,
+            consultas.INVENTARIO_CLAVES,
+            parent=self,
+        )
+        self.inventario_table = QTableView()
+        self.inventario_table.setModel(self.inventario_model)
+        self.inventario_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        if self.role == "administrador":
+            self.delegado_eliminar = DelegadoBoton("Eliminar", self.inventario_table)
+            self.delegado_eliminar.pulsado.connect(
+                lambda index: self.eliminar_compra(self.inventario_model.valor(index.row(), "c.id_compra"))
+            )
+            self.inventario_table.setItemDelegateForColumn(len(columnas) - 1, self.delegado_eliminar)
         layout.addWidget(self.inventario_table)
 
         central.setLayout(layout)
         self.load_inventario()
 
     def load_productos(self):
-        conn = sqlite3.connect(db.DB_NAME)
+        conn = db.get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT id_producto, nombre FROM productos")
         rows = cursor.fetchall()
         for pid, nombre in rows:
             self.product_combo.addItem(nombre, pid)
-        conn.close()
 
     def load_inventario(self):
-        self.inventario_table.setRowCount(0)
-
+        filtros = [("c.fecha BETWEEN ? AND ?", (
+            self.fecha_desde.date().toString("yyyy-MM-dd"),
+            self.fecha_hasta.date().toString("yyyy-MM-dd"),
+        ))]
         producto_id = self.product_combo.currentData()
-        desde = self.fecha_desde.date().toString("yyyy-MM-dd")
-        hasta = self.fecha_hasta.date().toString("yyyy-MM-dd")
-
-        conn = sqlite3.connect(db.DB_NAME)
-        cursor = conn.cursor()
-
-        sql = """
-                SELECT DISTINCT i.id, p.nombre, i.cantidad, i.precio_unitario, c.fecha, c.id_compra
-                FROM inventarios i
-                JOIN productos p ON i.id_producto = p.id_producto
-                JOIN compras c ON i.id_compra = c.id_compra
-                WHERE c.fecha BETWEEN ? AND ?
-        """
-        params = [desde, hasta]
-
         if producto_id is not None:
-            sql += " AND i.id_producto = ?"
-            params.append(producto_id)
-
-        sql += " ORDER BY c.fecha ASC"
-
-        cursor.execute(sql, params)
-        rows = cursor.fetchall()
-        self.inventario_table.setRowCount(len(rows))
-
-        for i, (inv_id, producto, cantidad, precio_unitario, fecha, compra_id) in enumerate(rows):
-            self.inventario_table.setItem(i, 0, QTableWidgetItem(str(inv_id)))
-            self.inventario_table.setItem(i, 1, QTableWidgetItem(producto))
-            self.inventario_table.setItem(i, 2, QTableWidgetItem(str(cantidad)))
-            self.inventario_table.setItem(i, 3, QTableWidgetItem(f"{precio_unitario:.2f}"))
-            self.inventario_table.setItem(i, 4, QTableWidgetItem(fecha))
-
-            if self.role == "administrador":
-                btn_delete = QPushButton("Eliminar")
-                btn_delete.clicked.connect(lambda checked, cid=compra_id: self.eliminar_compra(cid))
-                self.inventario_table.setCellWidget(i, 5, btn_delete)
+            filtros.append(("i.id_producto = ?", (producto_id,)))
+        self.inventario_model.set_filtros(filtros)
 
-        conn.close()
 
     def eliminar_compra(self, compra_id):
         reply = QMessageBox.question(
@@ -133,15 +121,12 @@ class InventarioWindow(QMainWindow):
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         if reply == QMessageBox.StandardButton.Yes:
-            conn = sqlite3.connect(db.DB_NAME)
-            cursor = conn.cursor()
-            # Eliminar detalle de compras
-            cursor.execute("DELETE FROM detalle_compras WHERE id_compra = ?", (compra_id,))
-            # Eliminar compra
-            cursor.execute("DELETE FROM compras WHERE id_compra = ?", (compra_id,))
-            # Eliminar inventario asociado
-            cursor.execute("DELETE FROM inventarios WHERE id_compra = ?", (compra_id,))
-            conn.commit()
-            conn.close()
+            try:
+                # Stock, detalle y lotes en una transacción (detalle y lotes caen en cascada)
+                eliminar_compra(compra_id)
+            except ValueError as e:
+                QMessageBox.warning(self, "Error", str(e))
+                return
+            # Sólo salen de la tabla los lotes de esa compra
+            self.inventario_model.quitar_filas_con("c.id_compra", compra_id)
             QMessageBox.information(self, "Éxito", f"Compra #{compra_id} y su inventario eliminado.")
-            self.load_inventario()
@@ -0,0 +1,155 @@
+"""Reportes y tareas del inventario desde la línea de comandos (sin interfaz gráfica).
+
+Ejemplos:
+    python -m inventario_cli kardex --desde 2025-01-01 --hasta 2025-12-31 --metodo PEPS --formato xlsx -o kardex.xlsx
+    python -m inventario_cli valuacion --fecha 2025-12-31 --metodo PMP --db /ruta/sistema.db
+    python -m inventario_cli importar compras historico.xlsx --usuario ADMIN
+    python -m inventario_cli liberar --metodo PEPS --hasta 2025-12-31
+
+No importa PyQt6, así que sirve para tareas programadas (cron) en un servidor.
+"""
+import argparse
+import sys
+from datetime import date
+
+import database as db
+from costeo import METODOS, generar_kardex, generar_kardex_paralelo, valuacion
+from reportes import exportar_kardex_csv, exportar_kardex_excel, exportar_kardex_pdf, exportar_valuacion
+
+FORMATOS_KARDEX = ("csv", "xlsx", "pdf")
+FORMATOS_VALUACION = ("csv", "xlsx")
+
+
+def _fecha(texto):
+    try:
+        return date.fromisoformat(texto).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fecha inválida (se espera AAAA-MM-DD): {texto}")
+
+
+def _salida(args):
+    """Ruta de salida; '-' (o nada, en csv) escribe en la salida estándar."""
+    if args.salida in (None, "-"):
+        if args.formato != "csv":
+            raise SystemExit(f"error: el formato {args.formato} necesita --salida")
+        return sys.stdout
+    return args.salida
+
+
+def cmd_kardex(args):
+    conn = db.get_connection()
+    if args.procesos and args.procesos > 1:
+        filas = generar_kardex_paralelo(db.DB_NAME, args.metodo, args.desde, args.hasta, args.procesos)
+    else:
+        filas = generar_kardex(conn, args.metodo, args.desde, args.hasta)
+
+    salida = _salida(args)
+    if args.formato == "xlsx":
+        total = exportar_kardex_excel(salida, filas)
+    elif args.formato == "pdf":
+        total = exportar_kardex_pdf(salida, filas)
+    else:
+        total = exportar_kardex_csv(salida, filas)
+    if salida is not sys.stdout:
+        print(f"Kardex {args.metodo} {args.desde} a {args.hasta}: {total} filas en {salida}", file=sys.stderr)
+    return 0
+
+
+def cmd_valuacion(args):
+    filas = valuacion(db.get_connection(), args.metodo, args.fecha)
+    salida = _salida(args)
+    exportar_valuacion(salida, filas, args.formato)
+    if salida is not sys.stdout:
+        valor = sum(fila[3] for fila in filas)
+        print(f"Valuación {args.metodo} al {args.fecha}: {len(filas)} productos, "
+              f"valor {valor:.2f} en {salida}", file=sys.stderr)
+    return 0
+
+
+def cmd_importar(args):
+    # Se importa aquí para no cargarlo en los reportes
+    from importacion import IMPORTADORES
+
+    opciones = {}
+    if args.tipo != "productos":
+        # Las compras y ventas referencian al usuario que las registra
+        opciones["usuario_id"] = db.id_usuario(args.usuario)
+        if opciones["usuario_id"] is None:
+            raise SystemExit(f"error: no existe el usuario {args.usuario} (indique otro con --usuario)")
+    try:
+        resultado = IMPORTADORES[args.tipo](args.archivo, **opciones)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"{args.tipo}: {resultado.insertados} filas importadas, {len(resultado.errores)} con errores")
+    for fila, mensaje in resultado.errores[:args.max_errores]:
+        print(f"  fila {fila}: {mensaje}")
+    if len(resultado.errores) > args.max_errores:
+        print(f"  ... y {len(resultado.errores) - args.max_errores} más")
+    return 1 if resultado.errores else 0
+
+
+def cmd_liberar(args):
+    from servicio_liberaciones import liberar_pendientes
+
+    resultado = liberar_pendientes(args.metodo, args.hasta)
+    print(f"{len(resultado.liberadas)} ventas liberadas con {args.metodo}, costo total {resultado.total:.2f}; "
+          f"{len(resultado.omitidas)} sin liberar")
+    for _, motivo in resultado.omitidas[:args.max_errores]:
+        print(f"  {motivo}")
+    if len(resultado.omitidas) > args.max_errores:
+        print(f"  ... y {len(resultado.omitidas) - args.max_errores} más")
+    return 1 if resultado.omitidas else 0
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="inventario_cli", description="Reportes del sistema de inventario.")
+    parser.add_argument("--db", help=f"archivo de la base de datos (por defecto {db.DB_NAME})")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    hoy = date.today().isoformat()
+
+    p = sub.add_parser("kardex", help="kardex de movimientos entre dos fechas")
+    p.add_argument("--desde", "--from", dest="desde", type=_fecha, required=True)
+    p.add_argument("--hasta", "--to", dest="hasta", type=_fecha, default=hoy)
+    p.add_argument("--metodo", "--method", dest="metodo", choices=METODOS, default="PEPS")
+    p.add_argument("--formato", "--format", dest="formato", choices=FORMATOS_KARDEX, default="csv")
+    p.add_argument("-o", "--salida", "--output", dest="salida", help="archivo de salida ('-' = pantalla, sólo csv)")
+    p.add_argument("--procesos", type=int, default=0,
+                   help="reparte el costeo por producto entre N procesos (no guarda cortes)")
+    p.set_defaults(funcion=cmd_kardex)
+
+    p = sub.add_parser("valuacion", help="existencias y valor por producto a una fecha")
+    p.add_argument("--fecha", "--date", dest="fecha", type=_fecha, default=hoy)
+    p.add_argument("--metodo", "--method", dest="metodo", choices=METODOS, default="PEPS")
+    p.add_argument("--formato", "--format", dest="formato", choices=FORMATOS_VALUACION, default="csv")
+    p.add_argument("-o", "--salida", "--output", dest="salida", help="archivo de salida ('-' = pantalla, sólo csv)")
+    p.set_defaults(funcion=cmd_valuacion)
+
+    p = sub.add_parser("importar", help="carga masiva desde CSV o Excel (.xlsx)")
+    p.add_argument("tipo", choices=("productos", "compras", "ventas"))
+    p.add_argument("archivo")
+    p.add_argument("--usuario", "--user", dest="usuario", default="ADMIN",
+                   help="usuario a cuyo nombre quedan las compras o ventas (por defecto ADMIN)")
+    p.add_argument("--max-errores", type=int, default=50, help="errores a mostrar (por defecto 50)")
+    p.set_defaults(funcion=cmd_importar)
+
+    p = sub.add_parser("liberar", help="libera todas las ventas pendientes, cada una en su fecha")
+    p.add_argument("--metodo", "--method", dest="metodo", choices=("PEPS", "UEPS"), default="PEPS")
+    p.add_argument("--hasta", "--to", dest="hasta", type=_fecha, help="sólo ventas hasta esta fecha")
+    p.add_argument("--max-errores", type=int, default=50, help="ventas omitidas a mostrar (por defecto 50)")
+    p.set_defaults(funcion=cmd_liberar)
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    if args.db:
+        db.DB_NAME = args.db
+    # Deja el esquema al día (tablas de cortes del kardex) sin crear usuarios
+    db.aplicar_migraciones()
+    return args.funcion(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,15 @@
 import sys
 import os
 from PyQt6.QtWidgets import (
-    QMainWindow, QWidget, QVBoxLayout, QLabel, QComboBox, QPushButton,
+    QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel, QComboBox, QPushButton,
     QMessageBox, QInputDialog, QTableWidget, QTableWidgetItem
 )
 from PyQt6.QtGui import QIcon
 from PyQt6.QtCore import QDate, Qt
-import sqlite3
+import consultas
 import database as db
+from costeo import MotorCosteo, safe_int, safe_float
+from servicio_liberaciones import eliminar_liberacion, liberar_pendientes, liberar_venta
 
 def resource_path(relative_path):
     """Obtiene la ruta absoluta del recurso, compatible con PyInstaller."""
@@ -39,13 +41,12 @@ class KardexVistaPreviaWindow(QMainWindow):
         self.mostrar_kardex_preview()
 
     def mostrar_kardex_preview(self):
-        conn = sqlite3.connect(db.DB_NAME)
+        conn = db.get_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT id_producto, cantidad FROM detalle_ventas WHERE id_venta = ?", (self.venta_id,))
+        cursor.execute(consultas.DETALLE_VENTA, (self.venta_id,))
         venta_detalle = cursor.fetchall()
         if not venta_detalle:
             QMessageBox.information(self, "Info", f"La venta #{self.venta_id} no tiene detalle.")
-            conn.close()
             return
 
         columnas = [
@@ -61,9 +62,8 @@ class KardexVistaPreviaWindow(QMainWindow):
             "Inventario Final", "Inventario Final", "Inventario Final"
         ]
 
-        total_rows = len(venta_detalle) * 2
         self.kardex_table.setColumnCount(len(columnas))
-        self.kardex_table.setRowCount(total_rows + 10)
+        self.kardex_table.setRowCount(2)
 
         # Encabezados
         for col, texto in enumerate(grupos):
@@ -82,68 +82,43 @@ class KardexVistaPreviaWindow(QMainWindow):
             self.kardex_table.setSpan(0, start_col, 1, span)
             self.kardex_table.setItem(0, start_col, QTableWidgetItem(text))
 
-        def safe_int(v):
-            try:
-                return int(v)
-            except:
-                return 0
-
-        def safe_float(v):
-            try:
-                return float(v)
-            except:
-                return 0.0
-
-        inventario_actual = {}
-        inventario_total = {}
-        row_idx = 2
+        motor = MotorCosteo(self.metodo)
+        filas = []
 
         for producto_id, cantidad_requerida in venta_detalle:
-            cantidad_restante = cantidad_requerida
-            orden = "DESC" if self.metodo == "UEPS" else "ASC"
-            cursor.execute(f"""
-                SELECT id, cantidad, precio_unitario, fecha_compra
-                FROM inventarios
-                WHERE id_producto = ? AND cantidad > 0
-                ORDER BY fecha_compra {orden}
-            """, (producto_id,))
-            inventarios = cursor.fetchall()
-            if not inventarios:
+            if producto_id not in motor.lotes:
+                cursor.execute(consultas.LOTES_DE_PRODUCTO, (producto_id,))
+                for inv_id, inv_cant, inv_precio, fecha_compra in cursor.fetchall():
+                    motor.compra(producto_id, inv_id, safe_int(inv_cant), safe_float(inv_precio), fecha_compra)
+            if not motor.lotes_vivos(producto_id):
                 QMessageBox.warning(self, "Error", f"No hay inventario para el producto {producto_id}.")
                 continue
 
-            inv_id, inv_cant, inv_precio, fecha_compra = inventarios[0]
-            inventario_actual[inv_id] = (inv_cant, inv_precio)
-            inventario_total[producto_id] = inventario_total.get(producto_id, 0) + inv_cant
+            consumos, _ = motor.venta(producto_id, cantidad_requerida)
+            final_cant = sum(l.cantidad for l in motor.lotes_vivos(producto_id))
+            for lot, salida_cant in consumos:
+                inv_cant = lot.cantidad + salida_cant
+                inv_precio = lot.precio
+                # Entrada
+                filas.append([
+                    str(lot.fecha), "Compra", str(producto_id),
+                    str(inv_cant), f"{inv_precio:.2f}", f"{inv_cant * inv_precio:.2f}",
+                    "-", "-", "-",
+                    str(inv_cant), f"{inv_precio:.2f}", f"{inv_cant * inv_precio:.2f}"
+                ])
+                # Salida
+                filas.append([
+                    "-", "Venta", str(producto_id),
+                    "-", "-", "-",
+                    str(salida_cant), f"{inv_precio:.2f}", f"{salida_cant * inv_precio:.2f}",
+                    str(final_cant), f"{inv_precio:.2f}", f"{final_cant * inv_precio:.2f}"
+                ])
 
-            # Entrada
-            compra_row = [
-                str(fecha_compra), "Compra", str(producto_id),
-                str(inv_cant), f"{inv_precio:.2f}", f"{inv_cant * inv_precio:.2f}",
-                "-", "-", "-",
-                str(inv_cant), f"{inv_precio:.2f}", f"{inv_cant * inv_precio:.2f}"
-            ]
-            for col, val in enumerate(compra_row):
-                self.kardex_table.setItem(row_idx, col, QTableWidgetItem(str(val)))
-            row_idx += 1
-
-            # Salida
-            salida_cant = cantidad_requerida
-            salida_prec = inv_precio
-            inventario_actual[inv_id] = (inv_cant - salida_cant, inv_precio)
-            inventario_total[producto_id] = max(inventario_total[producto_id] - salida_cant, 0)
-            final_cant = inventario_total[producto_id]
-            venta_row = [
-                "-", "Venta", str(producto_id),
-                "-", "-", "-",
-                str(salida_cant), f"{salida_prec:.2f}", f"{salida_cant * salida_prec:.2f}",
-                str(final_cant), f"{salida_prec:.2f}", f"{final_cant * salida_prec:.2f}"
-            ]
-            for col, val in enumerate(venta_row):
-                self.kardex_table.setItem(row_idx, col, QTableWidgetItem(str(val)))
-            row_idx += 1
+        self.kardex_table.setRowCount(2 + len(filas))
+        for row_idx, fila in enumerate(filas, start=2):
+            for col, val in enumerate(fila):
+                self.kardex_table.setItem(row_idx, col, QTableWidgetItem(val))
 
-        conn.close()
         self.kardex_table.resizeColumnsToContents()
         self.kardex_table.resizeRowsToContents()
         self.kardex_table.verticalHeader().setVisible(False)
@@ -174,6 +149,10 @@ class LiberacionWindow(QMainWindow):
         self.btn_liberar_peps.clicked.connect(lambda: self.liberar_venta(metodo="PEPS"))
         layout.addWidget(self.btn_liberar_peps)
 
+        self.btn_liberar_pendientes = QPushButton("Liberar todas las pendientes")
+        self.btn_liberar_pendientes.clicked.connect(self.liberar_pendientes)
+        layout.addWidget(self.btn_liberar_pendientes)
+
         self.btn_vista_previa = QPushButton("Vista Previa")
         self.btn_vista_previa.clicked.connect(self.vista_previa_avanzada)
         layout.addWidget(self.btn_vista_previa)
@@ -184,17 +163,9 @@ class LiberacionWindow(QMainWindow):
 
         central.setLayout(layout)
 
-    def _table_has_column(self, table_name: str, column_name: str) -> bool:
-        conn = sqlite3.connect(db.DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        cols = [r[1] for r in cursor.fetchall()]
-        conn.close()
-        return column_name in cols
-
     def load_ventas(self):
         self.venta_combo.clear()
-        conn = sqlite3.connect(db.DB_NAME)
+        conn = db.get_connection()
         cursor = conn.cursor()
         cursor.execute("""
             SELECT v.id_venta, IFNULL(SUM(d.cantidad), 0)
@@ -206,7 +177,6 @@ class LiberacionWindow(QMainWindow):
         rows = cursor.fetchall()
         for vid, total_cant in rows:
             self.venta_combo.addItem(f"Venta #{vid} - Cant total: {total_cant}", vid)
-        conn.close()
 
     def vista_previa_avanzada(self):
         venta_id = self.venta_combo.currentData()
@@ -234,12 +204,12 @@ class LiberacionWindow(QMainWindow):
         layout.addWidget(self.preview_table)
         central.setLayout(layout)
 
-        conn = sqlite3.connect(db.DB_NAME)
+        conn = db.get_connection()
         cursor = conn.cursor()
 
         try:
             # Obtener detalle de la venta
-            cursor.execute("SELECT id_producto, cantidad FROM detalle_ventas WHERE id_venta = ?", (venta_id,))
+            cursor.execute(consultas.DETALLE_VENTA, (venta_id,))
             venta_detalle = cursor.fetchall()
             if not venta_detalle:
                 QMessageBox.information(self, "Info", f"La venta #{venta_id} no tiene detalle.")
@@ -287,43 +257,27 @@ class LiberacionWindow(QMainWindow):
             merge_group(6, 3, "Salidas")
             merge_group(9, 3, "Inventario Final")
 
-            def safe_int(v):
-                try:
-                    return int(v)
-                except:
-                    return 0
-
-            def safe_float(v):
-                try:
-                    return float(v)
-                except:
-                    return 0.0
-
             row_idx = 2
             inventario_total = {}  # por producto
+            motor = MotorCosteo(metodo)
 
             for producto_id, cantidad_venta in venta_detalle:
-                # Obtener inventarios disponibles por compra
-                orden = "DESC" if metodo == "UEPS" else "ASC"
-                cursor.execute(f"""
-                    SELECT i.id, i.cantidad, i.precio_unitario, c.fecha
-                    FROM inventarios i
-                    JOIN compras c ON c.id_compra = i.id_compra
-                    WHERE i.id_producto = ? AND i.cantidad > 0
-                    ORDER BY c.fecha {orden}
-                """, (producto_id,))
-                inventarios = cursor.fetchall()
-
-                cantidad_restante = cantidad_venta
-
-                for inv_id, inv_cant, precio_unitario, fecha_compra in inventarios:
-                    if cantidad_restante <= 0:
-                        break
-                    tomar = min(inv_cant, cantidad_restante)
+                # Obtener inventarios disponibles por compra, en orden cronológico
+                if producto_id not in motor.lotes:
+                    cursor.execute(consultas.LOTES_DE_PRODUCTO, (producto_id,))
+                    for inv_id, inv_cant, precio_unitario, fecha_compra in cursor.fetchall():
+                        motor.compra(producto_id, inv_id, safe_int(inv_cant), safe_float(precio_unitario), fecha_compra)
+
+                consumos, _ = motor.venta(producto_id, cantidad_venta)
+
+                for lot, tomar in consumos:
+                    precio_unitario = lot.precio
+                    final_cant = lot.cantidad
+                    inv_cant = final_cant + tomar
 
                     # Entradas: cantidad original en inventario (puede haber sido parcialmente usado antes)
                     entrada_row = [
-                        str(fecha_compra), "Compra", str(producto_id),
+                        str(lot.fecha), "Compra", str(producto_id),
                         str(inv_cant), f"{precio_unitario:.2f}", f"{inv_cant * precio_unitario:.2f}",
                         "-", "-", "-",
                         "-", "-", "-"
@@ -342,7 +296,6 @@ class LiberacionWindow(QMainWindow):
                         self.preview_table.setItem(row_idx + 1, col, QTableWidgetItem(str(val)))
 
                     # Inventario final: inventario restante de esa compra
-                    final_cant = inv_cant - tomar
                     inventario_total[producto_id] = inventario_total.get(producto_id, 0) + final_cant
                     final_row = [
                         "-", "Inventario Final", str(producto_id),
@@ -353,7 +306,6 @@ class LiberacionWindow(QMainWindow):
                     for col, val in enumerate(final_row):
                         self.preview_table.setItem(row_idx + 2, col, QTableWidgetItem(str(val)))
 
-                    cantidad_restante -= tomar
                     row_idx += 3
 
             # Totales finales por producto
@@ -385,8 +337,6 @@ class LiberacionWindow(QMainWindow):
 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Ocurrió un error en la vista previa: {e}")
-        finally:
-            conn.close()
 
         self.preview_win.show()
 
@@ -427,99 +377,61 @@ class LiberacionWindow(QMainWindow):
             return  # Cancelado por el usuario
         # ======================================
 
-        conn = sqlite3.connect(db.DB_NAME)
-        cursor = conn.cursor()
         try:
-            # Evitar liberar dos veces la misma venta
-            cursor.execute("SELECT id_liberacion FROM liberaciones WHERE id_venta = ?", (venta_id,))
-            if cursor.fetchone():
-                QMessageBox.warning(self, "Error", f"La venta #{venta_id} ya fue liberada anteriormente.")
-                return
-
-            # Obtener detalle de la venta
-            cursor.execute("SELECT id_producto, cantidad FROM detalle_ventas WHERE id_venta = ?", (venta_id,))
-            venta_detalle = cursor.fetchall()
-            if not venta_detalle:
-                QMessageBox.information(self, "Info", f"La venta #{venta_id} no tiene detalle.")
-                return
-
-            cantidad_total_venta = sum(row[1] for row in venta_detalle)
-
-            # Insertar cabecera en liberaciones con la fecha elegida
-            if self._table_has_column("liberaciones", "cantidad"):
-                cursor.execute("""
-                    INSERT INTO liberaciones (id_venta, total, cantidad, fecha)
-                    VALUES (?, ?, ?, ?)
-                """, (venta_id, 0.0, cantidad_total_venta, fecha_str))
-            else:
-                cursor.execute("""
-                    INSERT INTO liberaciones (id_venta, total, fecha)
-                    VALUES (?, ?, ?)
-                """, (venta_id, 0.0, fecha_str))
-            id_liberacion = cursor.lastrowid
-
-            total_general = 0.0
-
-            for producto_id, cantidad_requerida in venta_detalle:
-                cantidad_restante = cantidad_requerida
-
-                # Seleccionar inventarios disponibles según método y fecha de liberación
-                orden = "DESC" if metodo == "UEPS" else "ASC"
-                cursor.execute(f"""
-                    SELECT id, cantidad, precio_unitario
-                    FROM inventarios
-                    WHERE id_producto = ?
-                      AND cantidad > 0
-                      AND fecha_compra <= ?
-                    ORDER BY fecha_compra {orden}
-                """, (producto_id, fecha_str))
-                inventarios = cursor.fetchall()
-
-                total_disponible = sum(inv[1] for inv in inventarios)
-                if total_disponible < cantidad_requerida:
-                    conn.rollback()
-                    cursor.execute("DELETE FROM liberaciones WHERE id_liberacion = ?", (id_liberacion,))
-                    conn.commit()
-                    QMessageBox.warning(
-                        self, "Error",
-                        f"No hay suficiente inventario (hasta la fecha {fecha_str}) para el producto {producto_id} en la venta #{venta_id}."
-                    )
-                    return
-
-                for inv_id, inv_cant, precio_unitario in inventarios:
-                    if cantidad_restante <= 0:
-                        break
-                    tomar = min(inv_cant, cantidad_restante)
-                    subtotal = tomar * (precio_unitario if precio_unitario else 0.0)
-
-                    cursor.execute("""
-                        INSERT INTO liberacion_inventarios (id_liberacion, id_inventario, cantidad, total)
-                        VALUES (?, ?, ?, ?)
-                    """, (id_liberacion, inv_id, tomar, subtotal))
-
-                    cursor.execute("UPDATE inventarios SET cantidad = cantidad - ? WHERE id = ?", (tomar, inv_id))
-
-                    cantidad_restante -= tomar
-                    total_general += subtotal
-
-            cursor.execute("UPDATE liberaciones SET total = ? WHERE id_liberacion = ?", (total_general, id_liberacion))
-            conn.commit()
+            # Asignación de lotes en memoria y escritura en una sola transacción
+            id_liberacion, _ = liberar_venta(venta_id, metodo, fecha_str)
             QMessageBox.information(
                 self, "Éxito",
                 f"Venta #{venta_id} liberada correctamente (Liberación #{id_liberacion}) con método {metodo} en fecha {fecha_str}."
             )
-
+        except ValueError as e:
+            QMessageBox.warning(self, "Error", str(e))
         except Exception as e:
-            conn.rollback()
             QMessageBox.critical(self, "Error", f"Ocurrió un error al liberar la venta:\n{e}")
         finally:
-            conn.close()
             self.load_ventas()
 
 
 
+    def liberar_pendientes(self):
+        metodo, ok = QInputDialog.getItem(
+            self, "Liberar pendientes", "Seleccione método de inventario:", ["PEPS", "UEPS"], 0, False
+        )
+        if not ok or not metodo:
+            return
+
+        reply = QMessageBox.question(
+            self, "Liberar pendientes",
+            f"Se liberarán con {metodo} todas las ventas sin liberar, cada una en su fecha.\n¿Continuar?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            # Una sola transacción: si algo falla no queda nada a medias
+            resultado = liberar_pendientes(metodo)
+        except Exception as e:
+            resultado = None
+            error = e
+        finally:
+            QApplication.restoreOverrideCursor()
+            self.load_ventas()
+        if resultado is None:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error al liberar las ventas:\n{error}")
+            return
+
+        mensaje = f"{len(resultado.liberadas)} ventas liberadas con {metodo}. Costo total: {resultado.total:.2f}"
+        if resultado.omitidas:
+            mensaje += f"\n\n{len(resultado.omitidas)} ventas sin liberar:\n"
+            mensaje += "\n".join(motivo for _, motivo in resultado.omitidas[:10])
+            if len(resultado.omitidas) > 10:
+                mensaje += f"\n... y {len(resultado.omitidas) - 10} más"
+        QMessageBox.information(self, "Liberar pendientes", mensaje)
+
     def eliminar_liberacion(self):
-        conn = sqlite3.connect(db.DB_NAME)
+        conn = db.get_connection()
         cursor = conn.cursor()
         try:
             cursor.execute("""
@@ -550,25 +462,12 @@ class LiberacionWindow(QMainWindow):
 
             id_liberacion = int(item.split("|")[0].replace("ID:", "").strip())
 
-            cursor.execute("""
-                SELECT id_inventario, cantidad
-                FROM liberacion_inventarios
-                WHERE id_liberacion = ?
-            """, (id_liberacion,))
-            detalles = cursor.fetchall()
-
-            for id_inv, cantidad in detalles:
-                cursor.execute("UPDATE inventarios SET cantidad = cantidad + ? WHERE id = ?", (cantidad, id_inv))
-
-            cursor.execute("DELETE FROM liberacion_inventarios WHERE id_liberacion = ?", (id_liberacion,))
-            cursor.execute("DELETE FROM liberaciones WHERE id_liberacion = ?", (id_liberacion,))
-
-            conn.commit()
+            # Devuelve los lotes con una sola sentencia; el detalle cae en cascada
+            eliminar_liberacion(id_liberacion)
             QMessageBox.information(self, "Eliminar liberación", "Liberación eliminada y cantidades devueltas al inventario correctamente.")
         except Exception as e:
             conn.rollback()
             QMessageBox.critical(self, "Error", f"Ocurrió un error al eliminar la liberación:\n{e}")
         finally:
-            conn.close()
             self.load_ventas()
 
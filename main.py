@@ -1,8 +1,13 @@
+# Va primero para poder medir las importaciones de abajo (ver perfil_arranque.py)
+import perfil_arranque
+perfil_arranque.iniciar()
+
 import sys
 import os
 import database as db
 from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QLineEdit, QPushButton, QMessageBox, QStyleFactory
 from PyQt6.QtGui import QIcon, QPalette, QColor
+from PyQt6.QtCore import QTimer
 from menu import MenuPrincipal  # Hub del sistema
 
 def resource_path(relative_path):
@@ -61,10 +66,19 @@ class LoginWindow(QWidget):
 # MAIN
 # =========================
 if __name__ == "__main__":
-    if not os.path.exists(db.DB_NAME):
-        db.initialize_db()
+    # Necesario en el ejecutable de PyInstaller para los procesos del kardex en paralelo
+    # (multiprocessing tarda en importarse, así que sólo se carga ahí)
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+    perfil_arranque.marca("importaciones")
+
+    # Idempotente: crea lo que falte (tablas, índices) también en bases existentes
+    db.initialize_db()
+    perfil_arranque.marca("initialize_db")
 
     app = QApplication(sys.argv)
+    perfil_arranque.marca("QApplication")
 
     app.setStyleSheet("""
         QWidget {
@@ -87,8 +101,13 @@ if __name__ == "__main__":
             background-color: #dcdcdc;
         }
     """)
+    perfil_arranque.marca("hoja de estilos")
 
 
     login_window = LoginWindow()
+    perfil_arranque.marca("LoginWindow (incluye íconos)")
     login_window.show()
+    perfil_arranque.marca("mostrar login")
+    # El reporte se escribe cuando el login ya se pintó
+    QTimer.singleShot(0, perfil_arranque.terminar)
     sys.exit(app.exec())
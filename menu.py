@@ -6,11 +6,7 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtGui import QIcon, QFont, QColor
 from PyQt6.QtCore import Qt, QSize
-from compras import ComprasWindow
-from inventario import InventarioWindow
-from venta import VentasWindow
-from kardex import KardexWindow
-from usuario import MainMenu as UsuarioMenu
+# Las ventanas de cada módulo se importan al abrirlas para que el login aparezca rápido
 
 def resource_path(relative_path):
     """Obtiene la ruta absoluta del recurso, compatible con PyInstaller."""
@@ -163,18 +159,22 @@ class MenuPrincipal(QMainWindow):
 
     # --- Métodos de apertura ---
     def abrir_compras(self):
-        self.compras_window = ComprasWindow(role=self.role)
+        from compras import ComprasWindow
+        self.compras_window = ComprasWindow(role=self.role, username=self.username)
         self.compras_window.show()
 
     def abrir_inventario(self):
+        from inventario import InventarioWindow
         self.inventario_window = InventarioWindow(role=self.role)
         self.inventario_window.show()
 
     def abrir_ventas(self):
-        self.ventas_window = VentasWindow(role=self.role)
+        from venta import VentasWindow
+        self.ventas_window = VentasWindow(role=self.role, username=self.username)
         self.ventas_window.show()
 
     def abrir_kardex(self):
+        from kardex import KardexWindow
         self.kardex_window = KardexWindow()
         self.kardex_window.show()
 
@@ -245,6 +245,7 @@ class MenuPrincipal(QMainWindow):
             QMessageBox.warning(self, "Acceso denegado",
                                 "No tienes los permisos suficientes para acceder a esta función.")
             return
+        from usuario import MainMenu as UsuarioMenu
         self.usuario_window = UsuarioMenu()
         self.usuario_window.show()
 
@@ -0,0 +1,220 @@
+"""Modelos de tabla que leen la base por páginas a medida que se hace scroll."""
+import bisect
+
+from PyQt6.QtCore import QAbstractTableModel, QEvent, QModelIndex, QPersistentModelIndex, Qt, pyqtSignal
+from PyQt6.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionButton
+
+import consultas
+import database as db
+
+FILAS_POR_PAGINA = 200
+
+
+class Columna:
+    """Encabezado, expresión SQL y formato (función valor -> texto) de una columna."""
+    __slots__ = ("encabezado", "expresion", "formato")
+
+    def __init__(self, encabezado, expresion, formato=str):
+        self.encabezado = encabezado
+        self.expresion = expresion
+        self.formato = formato
+
+
+class ModeloPaginado(QAbstractTableModel):
+    """Tabla de sólo lectura paginada por keyset (sin OFFSET).
+
+    `desde` es el FROM con sus JOIN y `claves` las expresiones que ordenan las
+    filas de forma única (por ejemplo ("d.id_venta", "d.id_detalle")). Cada
+    página pide las filas con clave mayor que la última cargada, así el costo
+    no crece con lo que ya se leyó. La vista pide más páginas con
+    canFetchMore/fetchMore al llegar al final del scroll.
+    """
+
+    def __init__(self, columnas, desde, claves, pagina=FILAS_POR_PAGINA, parent=None):
+        super().__init__(parent)
+        self.columnas = columnas
+        self.desde = desde
+        self.claves = claves
+        self.pagina = pagina
+        self.filas = []       # valores crudos de las columnas + claves al final
+        self.filtros = []     # [(condición SQL, parámetros)]
+        self._completo = False
+
+    # --- Consulta ---
+    def set_filtros(self, filtros):
+        """Cambia los filtros (condiciones SQL con sus parámetros) y vuelve a empezar."""
+        self.filtros = list(filtros)
+        self.recargar()
+
+    def recargar(self):
+        self.beginResetModel()
+        self.filas = []
+        self._completo = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def _consultar(self, ultima, limite, extra=None):
+        condiciones = [c for c, _ in self.filtros]
+        parametros = [p for _, ps in self.filtros for p in ps]
+        if extra:
+            condiciones.append(extra[0])
+            parametros += extra[1]
+        if ultima is not None:
+            parametros += [ultima[0], *ultima]
+        sql = consultas.sql_pagina(
+            [c.expresion for c in self.columnas], self.desde, self.claves, condiciones, ultima is not None
+        )
+        return db.get_connection().execute(sql, (*parametros, limite)).fetchall()
+
+    def _ultima_clave(self):
+        return self.filas[-1][len(self.columnas):] if self.filas else None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._completo
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._completo:
+            return
+        nuevas = self._consultar(self._ultima_clave(), self.pagina)
+        self._completo = len(nuevas) < self.pagina
+        self._insertar(nuevas)
+
+    def cargar_nuevas(self):
+        """Agrega al final las filas registradas después de la última cargada.
+
+        Si todavía quedan páginas por leer no hace nada: llegarán con el scroll.
+        """
+        if not self._completo:
+            return
+        nuevas = self._consultar(self._ultima_clave(), -1)
+        self._insertar(nuevas)
+
+    def agregar_filas_donde(self, condicion, parametros=()):
+        """Inserta en su lugar las filas que cumplen `condicion` (y los filtros).
+
+        Sirve para mostrar un documento recién registrado sin releer la
+        tabla. Las filas que caen después de la última página cargada se
+        omiten: aparecerán con el scroll.
+        """
+        nuevas = self._consultar(None, -1, (condicion, parametros))
+        n = len(self.columnas)
+        claves = [fila[n:] for fila in self.filas]
+        for fila in nuevas:
+            clave = fila[n:]
+            if not self._completo and (not claves or clave > claves[-1]):
+                continue
+            posicion = bisect.bisect_left(claves, clave)
+            if posicion < len(claves) and claves[posicion] == clave:
+                continue  # ya estaba cargada
+            self.beginInsertRows(QModelIndex(), posicion, posicion)
+            self.filas.insert(posicion, fila)
+            claves.insert(posicion, clave)
+            self.endInsertRows()
+
+    def _insertar(self, nuevas):
+        if not nuevas:
+            return
+        inicio = len(self.filas)
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(nuevas) - 1)
+        self.filas.extend(nuevas)
+        self.endInsertRows()
+
+    def _posicion(self, nombre):
+        """Posición en la fila cruda de una columna (por encabezado) o de una clave."""
+        for i, columna in enumerate(self.columnas):
+            if columna.encabezado == nombre:
+                return i
+        return len(self.columnas) + self.claves.index(nombre)
+
+    def valor(self, fila, nombre):
+        """Valor crudo (sin formato) de la columna o clave `nombre` en la fila `fila`."""
+        return self.filas[fila][self._posicion(nombre)]
+
+    def quitar_filas_con(self, nombre, valor):
+        """Quita las filas cargadas cuya columna o clave `nombre` vale `valor`."""
+        posicion = self._posicion(nombre)
+        self.quitar_filas(lambda fila: fila[posicion] == valor)
+
+    def quitar_filas(self, predicado):
+        """Quita las filas cargadas que cumplen `predicado(fila)`, sin releer la base."""
+        fila = len(self.filas) - 1
+        # De abajo hacia arriba, por tramos seguidos, para avisar a la vista una vez por tramo
+        while fila >= 0:
+            if not predicado(self.filas[fila]):
+                fila -= 1
+                continue
+            fin = fila
+            while fila >= 0 and predicado(self.filas[fila]):
+                fila -= 1
+            self.beginRemoveRows(QModelIndex(), fila + 1, fin)
+            del self.filas[fila + 1:fin + 1]
+            self.endRemoveRows()
+
+    # --- Qt ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.filas)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columnas)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid():
+            columna = self.columnas[index.column()]
+            return columna.formato(self.filas[index.row()][index.column()])
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.columnas[section].encabezado
+        return None
+
+
+class DelegadoBoton(QStyledItemDelegate):
+    """Pinta un botón en cada celda de una columna, sin crear widgets por fila.
+
+    Emite `pulsado` con el índice de la celda al soltar el clic sobre ella.
+    Mira los eventos del viewport de `vista` para soltar el botón aunque el
+    clic termine en otra columna o fuera de la tabla.
+    """
+    pulsado = pyqtSignal(QModelIndex)
+
+    def __init__(self, texto, vista):
+        super().__init__(vista)
+        self.texto = texto
+        self.vista = vista
+        self._presionado = None  # QPersistentModelIndex mientras se mantiene el clic
+        vista.viewport().installEventFilter(self)
+
+    def paint(self, painter, option, index):
+        boton = QStyleOptionButton()
+        boton.rect = option.rect.adjusted(2, 2, -2, -2)
+        boton.text = self.texto
+        boton.state = QStyle.StateFlag.State_Enabled
+        if self._presionado is not None and self._presionado == index:
+            boton.state |= QStyle.StateFlag.State_Sunken
+        else:
+            boton.state |= QStyle.StateFlag.State_Raised
+        estilo = option.widget.style() if option.widget else QApplication.style()
+        estilo.drawControl(QStyle.ControlElement.CE_PushButton, boton, painter, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        tipo = event.type()
+        if tipo == QEvent.Type.MouseButtonPress and event.button() == Qt.MouseButton.LeftButton:
+            self._presionado = QPersistentModelIndex(index)
+            self.vista.update(index)
+            return True
+        if tipo == QEvent.Type.MouseButtonRelease:
+            return True  # ya lo resolvió eventFilter
+        return super().editorEvent(event, model, option, index)
+
+    def eventFilter(self, objeto, event):
+        # Llega antes que a la vista: cualquier soltar o salida libera el botón
+        tipo = event.type()
+        if self._presionado is not None and tipo in (QEvent.Type.MouseButtonRelease, QEvent.Type.Leave):
+            index = QModelIndex(self._presionado)
+            self._presionado = None
+            if index.isValid():
+                self.vista.update(index)
+                if tipo == QEvent.Type.MouseButtonRelease and self.vista.indexAt(event.position().toPoint()) == index:
+                    self.pulsado.emit(index)
+        return False
@@ -0,0 +1,127 @@
+"""Perfil del arranque de la aplicación.
+
+Se activa con la variable de entorno INVENTARIO_PERFIL_ARRANQUE (la ruta del
+log, o "1" para usar arranque.log en la carpeta actual). Registra cuánto
+tarda cada fase de main.py y cuánto cuesta importar cada módulo, con el
+mismo formato que `python -X importtime`, lo que también sirve dentro del
+ejecutable de PyInstaller. Sin la variable, todas las funciones no hacen nada.
+"""
+import datetime
+import os
+import sys
+import time
+
+VARIABLE_ENTORNO = "INVENTARIO_PERFIL_ARRANQUE"
+LOG_POR_DEFECTO = "arranque.log"
+
+_inicio = time.perf_counter()
+_activo = False
+_fases = []          # (nombre, ms)
+_importaciones = []  # (profundidad, nombre, propio_us, acumulado_us) en orden de término
+_pila = []           # tiempo de los hijos de cada importación en curso
+
+
+class _LoaderCronometrado:
+    """Envuelve el loader real y mide create_module + exec_module."""
+
+    def __init__(self, loader, nombre):
+        self._loader = loader
+        self._nombre = nombre
+        self._creacion = 0.0
+
+    def create_module(self, spec):
+        inicio = time.perf_counter()
+        try:
+            return self._loader.create_module(spec)
+        finally:
+            self._creacion = time.perf_counter() - inicio
+
+    def exec_module(self, module):
+        profundidad = len(_pila)
+        _pila.append(0.0)
+        inicio = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - inicio + self._creacion
+            hijos = _pila.pop()
+            if _pila:
+                _pila[-1] += total
+            _importaciones.append((profundidad, self._nombre, (total - hijos) * 1e6, total * 1e6))
+
+    def __getattr__(self, nombre):
+        return getattr(self._loader, nombre)
+
+
+class _BuscadorCronometrado:
+    """Finder que va primero en sys.meta_path y cronometra lo que encuentran los demás."""
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _LoaderCronometrado(spec.loader, fullname)
+            return spec
+        return None
+
+
+_buscador = _BuscadorCronometrado()
+
+
+def ruta_log():
+    valor = os.environ.get(VARIABLE_ENTORNO, "")
+    return os.path.abspath(LOG_POR_DEFECTO if valor == "1" else valor)
+
+
+def iniciar():
+    """Empieza a medir si la variable de entorno está definida."""
+    global _activo
+    if _activo or not os.environ.get(VARIABLE_ENTORNO):
+        return
+    _activo = True
+    sys.meta_path.insert(0, _buscador)
+
+
+def marca(nombre):
+    """Cierra la fase `nombre`: lo que pasó desde la marca anterior hasta ahora."""
+    if not _activo:
+        return
+    transcurrido = (time.perf_counter() - _inicio) * 1000
+    anterior = sum(ms for _, ms in _fases)
+    _fases.append((nombre, transcurrido - anterior))
+
+
+def terminar():
+    """Deja de medir importaciones y agrega el reporte al log."""
+    global _activo
+    if not _activo:
+        return
+    marca("hasta el primer ciclo de eventos")
+    _activo = False
+    if _buscador in sys.meta_path:
+        sys.meta_path.remove(_buscador)
+
+    lineas = [
+        f"=== Arranque {datetime.datetime.now():%Y-%m-%d %H:%M:%S} "
+        f"(python {sys.version.split()[0]}, {'empaquetado' if getattr(sys, 'frozen', False) else 'fuente'}) ===",
+        "Fases (ms):",
+    ]
+    for nombre, ms in _fases:
+        lineas.append(f"  {nombre:<40} {ms:9.1f}")
+    lineas.append(f"  {'total':<40} {sum(ms for _, ms in _fases):9.1f}")
+
+    lineas.append("Importaciones más costosas (acumulado, ms):")
+    directas = [i for i in _importaciones if i[0] == 0]
+    for _profundidad, nombre, _propio, acumulado in sorted(directas, key=lambda i: -i[3])[:15]:
+        lineas.append(f"  {nombre:<40} {acumulado / 1000:9.1f}")
+
+    lineas.append("import time: self [us] | cumulative | imported package")
+    for profundidad, nombre, propio, acumulado in _importaciones:
+        lineas.append(f"import time: {propio:9.0f} | {acumulado:10.0f} | {'  ' * profundidad}{nombre}")
+
+    with open(ruta_log(), "a", encoding="utf-8") as f:
+        f.write("\n".join(lineas) + "\n\n")
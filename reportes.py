@@ -0,0 +1,215 @@
+"""Exportación del kardex a archivos (sin Qt).
+
+Reciben las filas crudas del motor de costeo (ver costeo.generar_kardex), así
+que se pueden usar desde la ventana o desde procesos sin interfaz.
+
+openpyxl y reportlab se importan dentro de cada exportación: tardan en
+cargar y no hacen falta hasta que el usuario exporta.
+"""
+import csv
+
+from costeo import COLUMNAS, COLUMNAS_IMPORTE, FilaFaltante, formatear_fila, safe_float, safe_int
+
+# Filas por tabla del PDF: las que caben en una página horizontal carta
+FILAS_POR_TABLA_PDF = 29
+MARGEN_PDF = 18  # puntos
+
+ENCABEZADOS_VALUACION = ["Producto", "Existencia", "Costo Unitario", "Valor"]
+
+ENCABEZADOS_SUBTOTALES = [
+    "Producto", "Entradas", "Valor Entradas", "Salidas", "Valor Salidas", "Existencia", "Valor Existencia"
+]
+
+
+def encabezados_exportacion():
+    """Encabezados para Excel/PDF: "Precio Unitario" se abrevia como "Unitario"."""
+    return ["Unitario" if col == "Precio Unitario" else col for col in COLUMNAS]
+
+
+def exportar_kardex_excel(ruta, filas):
+    """Escribe las filas del kardex en `ruta` (.xlsx) a medida que llegan.
+
+    Usa un libro de sólo escritura, así que la memoria no crece con el número
+    de filas. Cantidades e importes quedan como números; las celdas sin valor
+    ('-' en pantalla) quedan vacías. Devuelve cuántas filas se escribieron.
+    """
+    return _escribir_excel(ruta, "Kardex", encabezados_exportacion(), filas, COLUMNAS_IMPORTE)
+
+
+def exportar_kardex_csv(ruta, filas):
+    """Escribe las filas del kardex en `ruta` (.csv, UTF-8) con valores sin formato.
+
+    `ruta` puede ser también un archivo ya abierto (p. ej. sys.stdout).
+    Devuelve cuántas filas se escribieron.
+    """
+    return _escribir_csv(ruta, encabezados_exportacion(), filas)
+
+
+def exportar_valuacion(ruta, filas, formato="csv"):
+    """Valuación por producto (ver costeo.valuacion) en csv o xlsx."""
+    if formato == "xlsx":
+        return _escribir_excel(ruta, "Valuación", ENCABEZADOS_VALUACION, filas, (2, 3))
+    return _escribir_csv(ruta, ENCABEZADOS_VALUACION, filas)
+
+
+def _escribir_excel(ruta, hoja, encabezados, filas, columnas_importe):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(hoja)
+
+    celdas = []
+    for texto in encabezados:
+        celda = WriteOnlyCell(ws, value=texto)
+        celda.font = Font(bold=True)
+        celdas.append(celda)
+    ws.append(celdas)
+
+    total = 0
+    for fila in filas:
+        valores = []
+        for col, valor in enumerate(fila):
+            if valor == "":
+                valor = None
+            if col in columnas_importe and valor is not None:
+                celda = WriteOnlyCell(ws, value=valor)
+                celda.number_format = "0.00"
+                valores.append(celda)
+            else:
+                valores.append(valor)
+        ws.append(valores)
+        total += 1
+
+    wb.save(ruta)
+    return total
+
+
+def _escribir_csv(ruta, encabezados, filas):
+    if hasattr(ruta, "write"):
+        f, cerrar = ruta, False
+    else:
+        f, cerrar = open(ruta, "w", newline="", encoding="utf-8"), True
+    try:
+        writer = csv.writer(f)
+        writer.writerow(encabezados)
+        total = 0
+        for fila in filas:
+            writer.writerow(["" if valor is None else valor for valor in fila])
+            total += 1
+        return total
+    finally:
+        if cerrar:
+            f.close()
+
+
+class _FlowablesPerezosos(list):
+    """Lista de flowables que se llena desde un generador.
+
+    doc.build consume la lista por el frente y pregunta len() en cada vuelta;
+    aquí se agrega el siguiente elemento sólo cuando la lista se vacía, así
+    nunca hay más de unas pocas tablas en memoria.
+    """
+
+    def __init__(self, origen):
+        super().__init__()
+        self._origen = origen
+
+    def __len__(self):
+        if not super().__len__():
+            siguiente = next(self._origen, None)
+            if siguiente is not None:
+                self.append(siguiente)
+        return super().__len__()
+
+
+def _tablas(encabezados, filas, ancho, estilo):
+    """Parte las filas en tablas de FILAS_POR_TABLA_PDF, cada una con su encabezado."""
+    from reportlab.platypus import Table
+
+    col_widths = [ancho / len(encabezados)] * len(encabezados)
+    bloque = []
+    for fila in filas:
+        bloque.append(fila)
+        if len(bloque) == FILAS_POR_TABLA_PDF:
+            yield Table([encabezados] + bloque, colWidths=col_widths, repeatRows=1, style=estilo)
+            bloque = []
+    if bloque:
+        yield Table([encabezados] + bloque, colWidths=col_widths, repeatRows=1, style=estilo)
+
+
+def _acumular_subtotales(filas, subtotales):
+    """Pasa las filas formateadas y va sumando por producto lo que muestran.
+
+    Las filas de faltante (costeo.FilaFaltante) repiten una venta ya sumada
+    en las filas de sus lotes, así que no cuentan como salidas.
+    """
+    for fila in filas:
+        tipo, producto = fila[1], str(fila[2])
+        sub = subtotales.setdefault(producto, [0, 0.0, 0, 0.0, 0, 0.0])
+        if tipo == "Compra":
+            sub[0] += safe_int(fila[4])
+            sub[1] += safe_float(fila[6])
+        elif tipo == "Venta" and not isinstance(fila, FilaFaltante):
+            sub[2] += safe_int(fila[7])
+            sub[3] += safe_float(fila[9])
+        elif tipo == "TOTAL":
+            sub[4] = safe_int(fila[10])
+            sub[5] = safe_float(fila[12])
+        yield formatear_fila(fila)
+
+
+def exportar_kardex_pdf(ruta, filas, titulo="Reporte de Kardex"):
+    """Escribe las filas del kardex en `ruta` (.pdf) en tablas de una página.
+
+    Las tablas se arman a medida que reportlab las va maquetando, de modo que
+    el tiempo crece en línea con el número de filas y la memoria no depende
+    del tamaño del reporte. Al final agrega los subtotales por producto.
+    Devuelve cuántas filas del kardex se escribieron.
+    """
+    from reportlab.platypus import SimpleDocTemplate, TableStyle, Paragraph, Spacer, PageBreak
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    estilo = TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+    ])
+    page_size = landscape(letter)
+    doc = SimpleDocTemplate(ruta, pagesize=page_size,
+                            leftMargin=MARGEN_PDF, rightMargin=MARGEN_PDF,
+                            topMargin=MARGEN_PDF, bottomMargin=MARGEN_PDF)
+    usable_width = page_size[0] - 2 * MARGEN_PDF
+    styles = getSampleStyleSheet()
+
+    total = 0
+    subtotales = {}
+
+    def contar(filas):
+        nonlocal total
+        for fila in filas:
+            total += 1
+            yield fila
+
+    def elementos():
+        yield Paragraph(titulo, styles["Heading1"])
+        yield Spacer(1, 12)
+        yield from _tablas(encabezados_exportacion(), _acumular_subtotales(contar(filas), subtotales), usable_width, estilo)
+
+        yield PageBreak()
+        yield Paragraph("Subtotales por producto", styles["Heading2"])
+        yield Spacer(1, 12)
+        resumen = (
+            [producto, str(sub[0]), f"{sub[1]:.2f}", str(sub[2]), f"{sub[3]:.2f}", str(sub[4]), f"{sub[5]:.2f}"]
+            for producto, sub in sorted(subtotales.items())
+        )
+        yield from _tablas(ENCABEZADOS_SUBTOTALES, resumen, usable_width, estilo)
+
+    doc.build(_FlowablesPerezosos(elementos()))
+    return total
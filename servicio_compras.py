@@ -0,0 +1,97 @@
+"""Registro de compras (sin Qt).
+
+Una compra con todas sus líneas se escribe en una sola transacción:
+compras, detalle_compras, inventarios (un lote por línea) y el stock de
+cada producto. Los ids salen de AUTOINCREMENT, no de MAX(id) + 1.
+"""
+import sqlite3
+
+import consultas
+import database as db
+
+
+class LineaCompra:
+    """Producto, cantidad y precio unitario (None = precio del producto)."""
+    __slots__ = ("id_producto", "cantidad", "precio_unitario")
+
+    def __init__(self, id_producto, cantidad, precio_unitario=None):
+        self.id_producto = id_producto
+        self.cantidad = cantidad
+        self.precio_unitario = precio_unitario
+
+
+def registrar_compra(fecha, lineas, usuario_id=1, proveedor_id=None, conn=None):
+    """Registra una compra de varias líneas. Devuelve (id_compra, total).
+
+    `lineas` son LineaCompra o tuplas (id_producto, cantidad[, precio]).
+    Lanza ValueError si no hay líneas, si alguna cantidad no es positiva o
+    si un producto, el usuario o el proveedor no existe; en ese caso no se
+    escribe nada.
+    """
+    lineas = [l if isinstance(l, LineaCompra) else LineaCompra(*l) for l in lineas]
+    if not lineas:
+        raise ValueError("La compra no tiene productos.")
+    for linea in lineas:
+        if linea.cantidad is None or linea.cantidad <= 0:
+            raise ValueError(f"Cantidad inválida para el producto {linea.id_producto}.")
+
+    conn = conn or db.get_connection()
+    try:
+        with db.transaccion(conn) as cursor:
+            db.exigir_usuario(cursor, usuario_id)
+            precios = _precios_productos(cursor, {l.id_producto for l in lineas})
+            faltan = sorted({l.id_producto for l in lineas} - precios.keys())
+            if faltan:
+                raise ValueError(f"Productos inexistentes: {', '.join(map(str, faltan))}")
+
+            detalle = []
+            stock = {}
+            for linea in lineas:
+                precio = precios[linea.id_producto] if linea.precio_unitario is None else float(linea.precio_unitario)
+                detalle.append((linea.id_producto, linea.cantidad, precio))
+                stock[linea.id_producto] = stock.get(linea.id_producto, 0) + linea.cantidad
+            total = sum(cantidad * precio for _, cantidad, precio in detalle)
+
+            cursor.execute(
+                "INSERT INTO compras (fecha, usuario_id, proveedor_id, total) VALUES (?, ?, ?, ?)",
+                (fecha, usuario_id, proveedor_id, total)
+            )
+            id_compra = cursor.lastrowid
+
+            cursor.executemany(
+                "INSERT INTO detalle_compras (id_compra, id_producto, cantidad, precio_unitario) VALUES (?, ?, ?, ?)",
+                [(id_compra, pid, cantidad, precio) for pid, cantidad, precio in detalle]
+            )
+            cursor.executemany(
+                "INSERT INTO inventarios (id_producto, cantidad, precio_unitario, fecha_compra, id_compra) VALUES (?, ?, ?, ?, ?)",
+                [(pid, cantidad, precio, fecha, id_compra) for pid, cantidad, precio in detalle]
+            )
+            cursor.executemany(
+                "UPDATE productos SET stock = stock + ? WHERE id_producto = ?",
+                [(cantidad, pid) for pid, cantidad in stock.items()]
+            )
+    except sqlite3.IntegrityError as e:
+        raise ValueError(f"No se pudo registrar la compra: {e}") from e
+    return id_compra, total
+
+
+def eliminar_compra(id_compra, conn=None):
+    """Quita del stock lo que entró con la compra y la borra.
+
+    El detalle y los lotes se borran en cascada. Lanza ValueError si algún
+    lote de la compra ya fue liberado; en ese caso no se borra nada.
+    """
+    conn = conn or db.get_connection()
+    try:
+        with db.transaccion(conn) as cursor:
+            cursor.execute(consultas.QUITAR_STOCK_COMPRA, (id_compra, id_compra))
+            cursor.execute("DELETE FROM compras WHERE id_compra = ?", (id_compra,))
+    except sqlite3.IntegrityError:
+        raise ValueError(
+            f"La compra #{id_compra} tiene lotes ya liberados; elimine primero esas liberaciones."
+        ) from None
+
+
+def _precios_productos(cursor, ids):
+    """{id_producto: precio} de los productos que existen."""
+    return dict(db.consultar_por_bloques(cursor, consultas.PRECIOS_PRODUCTOS, ids))
@@ -0,0 +1,204 @@
+"""Liberación de ventas contra los lotes de inventario (sin Qt).
+
+La asignación de lotes se calcula en memoria con MotorCosteo (PEPS o UEPS):
+los lotes abiertos de todos los productos de la venta se leen con una sola
+consulta y, si alcanza para todas las líneas, la liberación se escribe con
+executemany en una sola transacción. Si falta inventario no se escribe nada.
+
+liberar_pendientes hace lo mismo con todas las ventas sin liberar: las
+repasa en orden de fecha contra las colas de lotes en memoria y escribe
+todo junto (el cierre de mes es una sola operación).
+"""
+import consultas
+import database as db
+from costeo import MotorCosteo, safe_float, safe_int
+
+METODOS_LIBERACION = ("PEPS", "UEPS")
+
+
+class InventarioInsuficiente(ValueError):
+    """`faltantes` es {id_producto: cantidad que no alcanzó}."""
+
+    def __init__(self, id_venta, fecha, faltantes):
+        self.id_venta = id_venta
+        self.faltantes = faltantes
+        productos = ", ".join(f"{pid} (faltan {cantidad})" for pid, cantidad in sorted(faltantes.items()))
+        super().__init__(
+            f"No hay suficiente inventario (hasta la fecha {fecha}) en la venta #{id_venta} "
+            f"para los productos: {productos}"
+        )
+
+
+def cargar_lotes(cursor, motor, productos, hasta):
+    """Pone en el motor los lotes abiertos de `productos` comprados hasta `hasta`."""
+    for pid, inv_id, cantidad, precio, fecha_compra in db.consultar_por_bloques(
+        cursor, consultas.LOTES_ABIERTOS, productos, hasta
+    ):
+        motor.compra(pid, inv_id, safe_int(cantidad), safe_float(precio), fecha_compra)
+
+
+def asignar_lotes(motor, detalle):
+    """Consume del motor las líneas (id_producto, cantidad) de una venta.
+
+    Devuelve (consumos, faltantes): consumos es [(id_inventario, cantidad,
+    subtotal)] y faltantes {id_producto: cantidad que no alcanzó}.
+    """
+    consumos = []
+    faltantes = {}
+    for pid, cantidad in detalle:
+        tomados, faltante = motor.venta(pid, safe_int(cantidad))
+        if faltante > 0:
+            faltantes[pid] = faltantes.get(pid, 0) + faltante
+        consumos.extend((lote.id_inventario, tomado, tomado * lote.precio) for lote, tomado in tomados)
+    return consumos, faltantes
+
+
+def escribir_liberaciones(cursor, liberaciones):
+    """Inserta liberaciones ya calculadas y descuenta los lotes.
+
+    `liberaciones` es [(id_venta, fecha, cantidad, consumos)]; los ids se
+    asignan seguidos desde siguiente_id. Devuelve la lista de ids.
+    """
+    siguiente = db.siguiente_id(cursor, "liberaciones", "id_liberacion")
+    encabezados, detalle, descuentos = [], [], {}
+    for i, (id_venta, fecha, cantidad, consumos) in enumerate(liberaciones):
+        id_liberacion = siguiente + i
+        encabezados.append((id_liberacion, id_venta, sum(c[2] for c in consumos), cantidad, fecha))
+        for id_inventario, tomado, subtotal in consumos:
+            detalle.append((id_liberacion, id_inventario, tomado, subtotal))
+            descuentos[id_inventario] = descuentos.get(id_inventario, 0) + tomado
+
+    cursor.executemany(
+        "INSERT INTO liberaciones (id_liberacion, id_venta, total, cantidad, fecha) VALUES (?, ?, ?, ?, ?)",
+        encabezados
+    )
+    cursor.executemany(
+        "INSERT INTO liberacion_inventarios (id_liberacion, id_inventario, cantidad, total) VALUES (?, ?, ?, ?)",
+        detalle
+    )
+    cursor.executemany(
+        "UPDATE inventarios SET cantidad = cantidad - ? WHERE id = ?",
+        [(tomado, id_inventario) for id_inventario, tomado in descuentos.items()]
+    )
+    return [siguiente + i for i in range(len(encabezados))]
+
+
+def liberar_venta(id_venta, metodo, fecha, conn=None):
+    """Libera la venta con lotes comprados hasta `fecha`. Devuelve (id_liberacion, total).
+
+    Lanza ValueError si la venta ya fue liberada o no tiene detalle, e
+    InventarioInsuficiente si algún producto no alcanza; en esos casos no
+    se escribe nada.
+    """
+    if metodo not in METODOS_LIBERACION:
+        raise ValueError(f"Método de liberación desconocido: {metodo}")
+    conn = conn or db.get_connection()
+    with db.transaccion(conn) as cursor:
+        # Evitar liberar dos veces la misma venta
+        cursor.execute(consultas.LIBERACION_DE_VENTA, (id_venta,))
+        if cursor.fetchone():
+            raise ValueError(f"La venta #{id_venta} ya fue liberada anteriormente.")
+
+        cursor.execute(consultas.DETALLE_VENTA, (id_venta,))
+        detalle = cursor.fetchall()
+        if not detalle:
+            raise ValueError(f"La venta #{id_venta} no tiene detalle.")
+
+        motor = MotorCosteo(metodo)
+        cargar_lotes(cursor, motor, {pid for pid, _ in detalle}, fecha)
+        consumos, faltantes = asignar_lotes(motor, detalle)
+        if faltantes:
+            raise InventarioInsuficiente(id_venta, fecha, faltantes)
+
+        cantidad = sum(safe_int(c) for _, c in detalle)
+        id_liberacion, = escribir_liberaciones(cursor, [(id_venta, fecha, cantidad, consumos)])
+    return id_liberacion, sum(c[2] for c in consumos)
+
+
+class ResultadoLiberacion:
+    """Ventas liberadas [(id_venta, id_liberacion)] y omitidas [(id_venta, motivo)]."""
+    __slots__ = ("liberadas", "omitidas", "total")
+
+    def __init__(self):
+        self.liberadas = []
+        self.omitidas = []
+        self.total = 0.0
+
+
+def liberar_pendientes(metodo, hasta=None, conn=None):
+    """Libera todas las ventas sin liberación, en orden cronológico.
+
+    Cada venta se libera en su propia fecha con los lotes comprados hasta
+    ese día, como si se hubieran liberado una por una. Las ventas sin
+    inventario suficiente se omiten (sin consumir lotes) y se informan.
+    Todo se escribe en una sola transacción. Devuelve ResultadoLiberacion.
+    """
+    if metodo not in METODOS_LIBERACION:
+        raise ValueError(f"Método de liberación desconocido: {metodo}")
+    conn = conn or db.get_connection()
+    resultado = ResultadoLiberacion()
+    with db.transaccion(conn) as cursor:
+        cursor.execute(consultas.VENTAS_PENDIENTES, (hasta or "9999-12-31",))
+        ventas = []  # [(id_venta, fecha, [(id_producto, cantidad)])]
+        for id_venta, fecha, pid, cantidad in cursor.fetchall():
+            if not ventas or ventas[-1][0] != id_venta:
+                ventas.append((id_venta, fecha, []))
+            if pid is not None:
+                ventas[-1][2].append((pid, safe_int(cantidad)))
+        if not ventas:
+            return resultado
+
+        cursor.execute(consultas.LOTES_ABIERTOS_HASTA, (ventas[-1][1],))
+        lotes = cursor.fetchall()
+
+        motor = MotorCosteo(metodo)
+        disponible = {}  # id_producto -> unidades en las colas del motor
+        siguiente_lote = 0
+        liberaciones = []
+        for id_venta, fecha, detalle in ventas:
+            # Entran al motor los lotes comprados hasta la fecha de esta venta
+            while siguiente_lote < len(lotes) and lotes[siguiente_lote][4] <= fecha:
+                pid, inv_id, cantidad, precio, fecha_compra = lotes[siguiente_lote]
+                motor.compra(pid, inv_id, safe_int(cantidad), safe_float(precio), fecha_compra)
+                disponible[pid] = disponible.get(pid, 0) + safe_int(cantidad)
+                siguiente_lote += 1
+
+            if not detalle:
+                resultado.omitidas.append((id_venta, f"La venta #{id_venta} no tiene detalle."))
+                continue
+            pedido = {}
+            for pid, cantidad in detalle:
+                pedido[pid] = pedido.get(pid, 0) + cantidad
+            faltantes = {pid: c - disponible.get(pid, 0) for pid, c in pedido.items() if c > disponible.get(pid, 0)}
+            if faltantes:
+                resultado.omitidas.append((id_venta, str(InventarioInsuficiente(id_venta, fecha, faltantes))))
+                continue
+
+            consumos, _ = asignar_lotes(motor, detalle)
+            for pid, cantidad in pedido.items():
+                disponible[pid] -= cantidad
+            liberaciones.append((id_venta, fecha, sum(pedido.values()), consumos))
+            resultado.total += sum(c[2] for c in consumos)
+
+        if liberaciones:
+            ids = escribir_liberaciones(cursor, liberaciones)
+            resultado.liberadas = [(lib[0], id_liberacion) for lib, id_liberacion in zip(liberaciones, ids)]
+    return resultado
+
+
+def devolver_lotes(cursor, filtro, params):
+    """Devuelve a inventarios lo consumido por las liberaciones que cumplen `filtro`.
+
+    Una sola sentencia: cada lote suma lo que le tomaron todas esas
+    liberaciones. `filtro` es una condición sobre liberacion_inventarios
+    (consultas.FILTRO_LIBERACION o FILTRO_LIBERACIONES_VENTA).
+    """
+    cursor.execute(consultas.DEVOLVER_LOTES.format(filtro=filtro), (*params, *params))
+
+
+def eliminar_liberacion(id_liberacion, conn=None):
+    """Devuelve los lotes consumidos y borra la liberación (su detalle cae en cascada)."""
+    conn = conn or db.get_connection()
+    with db.transaccion(conn) as cursor:
+        devolver_lotes(cursor, consultas.FILTRO_LIBERACION, (id_liberacion,))
+        cursor.execute("DELETE FROM liberaciones WHERE id_liberacion = ?", (id_liberacion,))
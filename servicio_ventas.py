@@ -0,0 +1,110 @@
+"""Registro de ventas (sin Qt).
+
+Una venta con todas sus líneas se escribe en una sola transacción: ventas,
+detalle_ventas y el descuento del stock de cada producto. Antes de escribir
+se compara lo pedido con el stock de los productos, así una venta que deja
+algún producto en negativo se rechaza completa.
+"""
+import sqlite3
+
+import consultas
+import database as db
+from servicio_liberaciones import devolver_lotes
+
+
+class LineaVenta:
+    """Producto, cantidad y precio unitario de venta."""
+    __slots__ = ("id_producto", "cantidad", "precio_unitario")
+
+    def __init__(self, id_producto, cantidad, precio_unitario):
+        self.id_producto = id_producto
+        self.cantidad = cantidad
+        self.precio_unitario = precio_unitario
+
+
+class StockInsuficiente(ValueError):
+    """`faltantes` es {id_producto: (disponible, pedido)}."""
+
+    def __init__(self, faltantes, nombres=None):
+        self.faltantes = faltantes
+        nombres = nombres or {}
+        detalle = "\n".join(
+            f"- {nombres.get(pid, pid)}: disponible {disponible}, pedido {pedido}"
+            for pid, (disponible, pedido) in sorted(faltantes.items())
+        )
+        super().__init__(f"No hay stock suficiente:\n{detalle}")
+
+
+def stock_productos(cursor, ids):
+    """{id_producto: (nombre, stock)} de los productos que existen."""
+    filas = db.consultar_por_bloques(cursor, consultas.STOCK_PRODUCTOS, ids)
+    return {pid: (nombre, cantidad) for pid, nombre, cantidad in filas}
+
+
+def registrar_venta(fecha, lineas, cliente_id=None, usuario_id=1, conn=None):
+    """Registra una venta de varias líneas. Devuelve (id_venta, total).
+
+    `lineas` son LineaVenta o tuplas (id_producto, cantidad, precio).
+    Lanza StockInsuficiente si lo pedido supera el stock de algún producto
+    y ValueError si no hay líneas, si una cantidad o precio no es positivo
+    o si un producto, el usuario o el cliente no existe; en esos casos no
+    se escribe nada.
+    """
+    lineas = [l if isinstance(l, LineaVenta) else LineaVenta(*l) for l in lineas]
+    if not lineas:
+        raise ValueError("La venta no tiene productos.")
+    for linea in lineas:
+        if linea.cantidad is None or linea.cantidad <= 0:
+            raise ValueError(f"Cantidad inválida para el producto {linea.id_producto}.")
+        if linea.precio_unitario is None or linea.precio_unitario <= 0:
+            raise ValueError(f"Precio unitario inválido para el producto {linea.id_producto}.")
+
+    # Lo pedido por producto (un producto puede repetirse en el carrito)
+    pedido = {}
+    for linea in lineas:
+        pedido[linea.id_producto] = pedido.get(linea.id_producto, 0) + linea.cantidad
+
+    conn = conn or db.get_connection()
+    # BEGIN IMMEDIATE: nadie más puede descontar stock entre la lectura y la escritura
+    try:
+        with db.transaccion(conn) as cursor:
+            db.exigir_usuario(cursor, usuario_id)
+            stock = stock_productos(cursor, pedido)
+            faltan = sorted(pedido.keys() - stock.keys())
+            if faltan:
+                raise ValueError(f"Productos inexistentes: {', '.join(map(str, faltan))}")
+            faltantes = {pid: (stock[pid][1], cantidad) for pid, cantidad in pedido.items() if cantidad > stock[pid][1]}
+            if faltantes:
+                raise StockInsuficiente(faltantes, {pid: nombre for pid, (nombre, _) in stock.items()})
+
+            total = sum(l.cantidad * float(l.precio_unitario) for l in lineas)
+            cursor.execute(
+                "INSERT INTO ventas (fecha, cliente_id, usuario_id, total) VALUES (?, ?, ?, ?)",
+                (fecha, cliente_id, usuario_id, total)
+            )
+            id_venta = cursor.lastrowid
+
+            cursor.executemany(
+                "INSERT INTO detalle_ventas (id_venta, id_producto, cantidad, precio_unitario) VALUES (?, ?, ?, ?)",
+                [(id_venta, l.id_producto, l.cantidad, float(l.precio_unitario)) for l in lineas]
+            )
+            cursor.executemany(
+                "UPDATE productos SET stock = stock - ? WHERE id_producto = ?",
+                [(cantidad, pid) for pid, cantidad in pedido.items()]
+            )
+    except sqlite3.IntegrityError as e:
+        raise ValueError(f"No se pudo registrar la venta: {e}") from e
+    return id_venta, total
+
+
+def eliminar_venta(id_venta, conn=None):
+    """Borra la venta y devuelve las cantidades al stock.
+
+    Si la venta estaba liberada, los lotes consumidos vuelven a inventarios.
+    El detalle y las liberaciones se borran en cascada con la venta.
+    """
+    conn = conn or db.get_connection()
+    with db.transaccion(conn) as cursor:
+        devolver_lotes(cursor, consultas.FILTRO_LIBERACIONES_VENTA, (id_venta,))
+        cursor.execute(consultas.DEVOLVER_STOCK_VENTA, (id_venta, id_venta))
+        cursor.execute("DELETE FROM ventas WHERE id_venta = ?", (id_venta,))
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# Los módulos del sistema están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db  # noqa: E402
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    """Conexión a una base nueva y vacía, con el esquema y los índices al día."""
+    monkeypatch.setattr(db, "DB_NAME", str(tmp_path / "sistema.db"))
+    db.initialize_db()
+    yield db.get_connection()
+    db.close_connection()
@@ -0,0 +1,46 @@
+import pytest
+
+import consultas
+import database as db
+
+
+def plan(conn, sql, params):
+    return "\n".join(fila[3] for fila in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+
+@pytest.mark.parametrize(
+    "descripcion, sql, params, esperados", db.CONSULTAS_CRITICAS, ids=[c[0] for c in db.CONSULTAS_CRITICAS]
+)
+def test_consulta_critica_usa_sus_indices(conn, descripcion, sql, params, esperados):
+    texto = plan(conn, sql, params)
+    for indice in esperados:
+        assert f"INDEX {indice}" in texto, texto
+    assert "TEMP B-TREE FOR ORDER BY" not in texto, texto
+
+
+def test_verificar_indices_sin_fallos(conn):
+    assert db.verificar_indices(conn) == []
+
+
+def test_lotes_abiertos_con_muchos_productos_no_ordena_aparte(conn):
+    # cargar_lotes pide bloques de hasta 500 productos en un mismo IN
+    sql = consultas.LOTES_ABIERTOS.format(marcadores=",".join("?" * 500))
+    texto = plan(conn, sql, (*range(500), "2025-01-01"))
+    assert "idx_inventarios_producto_fecha" in texto
+    assert "TEMP B-TREE" not in texto
+
+
+def test_verificar_indices_detecta_un_orden_sin_indice(conn, monkeypatch):
+    monkeypatch.setattr(db, "CONSULTAS_CRITICAS", [
+        ("Lotes en orden global", consultas.LOTES_ABIERTOS.replace(
+            "ORDER BY id_producto ASC, fecha_compra ASC, id ASC", "ORDER BY fecha_compra ASC, id ASC"
+        ).format(marcadores="?,?"), (1, 2, "2025-01-01"), ["idx_inventarios_producto_fecha"]),
+    ])
+    assert [d for d, _ in db.verificar_indices(conn)] == ["Lotes en orden global"]
+
+
+def test_consultar_por_bloques_reune_todos_los_bloques(conn):
+    conn.executemany("INSERT INTO productos (nombre, precio) VALUES (?, 1)", [(f"p{i}",) for i in range(1200)])
+    ids = [pid for pid, in conn.execute("SELECT id_producto FROM productos")]
+    filas = list(db.consultar_por_bloques(conn.cursor(), consultas.PRECIOS_PRODUCTOS, ids))
+    assert sorted(pid for pid, _ in filas) == ids
@@ -0,0 +1,36 @@
+import pytest
+
+import importacion
+
+
+def escribir_csv(ruta, lineas):
+    ruta.write_text("\n".join(lineas) + "\n", encoding="utf-8")
+    return str(ruta)
+
+
+def test_documento_con_una_linea_invalida_se_omite_entero(conn, tmp_path):
+    importacion.importar_productos(escribir_csv(tmp_path / "p.csv", ["nombre,precio", "Arroz,2", "Frijol,3"]))
+    ruta = escribir_csv(tmp_path / "c.csv", [
+        "numero,fecha,producto,cantidad,precio_unitario",
+        "1,2025-01-02,Arroz,5,1.5",
+        "1,2025-01-02,Maiz,5,1.5",
+        "2,2025-01-03,Frijol,4,",
+    ])
+    resultado = importacion.importar_compras(ruta)
+
+    assert resultado.insertados == 1
+    # El mensaje lleva una sola vez la fila que falló; el CLI antepone "fila N:"
+    assert resultado.errores == [
+        (2, "documento omitido por el error de la fila 3"),
+        (3, "producto desconocido: Maiz"),
+    ]
+    assert conn.execute("SELECT cantidad, precio_unitario FROM detalle_compras").fetchall() == [(4, 3.0)]
+
+
+def test_usuario_inexistente_no_importa_nada(conn, tmp_path):
+    importacion.importar_productos(escribir_csv(tmp_path / "p.csv", ["nombre,precio", "Arroz,2"]))
+    ruta = escribir_csv(tmp_path / "v.csv", ["fecha,producto,cantidad,precio_unitario", "2025-01-02,Arroz,1,3"])
+
+    with pytest.raises(ValueError, match="usuario #99"):
+        importacion.importar_ventas(ruta, usuario_id=99)
+    assert conn.execute("SELECT COUNT(*) FROM ventas").fetchone()[0] == 0
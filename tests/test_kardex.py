@@ -0,0 +1,51 @@
+import csv
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+pytest.importorskip("PyQt6.QtCore")
+
+from kardex import ExportarKardexWorker  # noqa: E402
+from reportes import exportar_kardex_csv  # noqa: E402
+from servicio_compras import registrar_compra  # noqa: E402
+from servicio_ventas import registrar_venta  # noqa: E402
+
+
+@pytest.fixture
+def movimientos(conn):
+    conn.execute("INSERT INTO productos (nombre, precio) VALUES ('Arroz', 3)")
+    conn.commit()
+    registrar_compra("2025-01-05", [(1, 10, 2.0)])
+    registrar_venta("2025-01-20", [(1, 4, 3.0)])
+
+
+def exportar(ruta, cancelar=False):
+    worker = ExportarKardexWorker(1, "PEPS", "2025-01-01", "2025-01-31", exportar_kardex_csv, str(ruta))
+    senales = []
+    worker.signals.terminado.connect(lambda g, hay_filas: senales.append(("terminado", hay_filas)))
+    worker.signals.error.connect(lambda g, mensaje: senales.append(("error", mensaje)))
+    if cancelar:
+        worker.cancelar()
+    worker.run()  # en el mismo hilo: las señales llegan directo
+    return senales
+
+
+def test_exportar_escribe_el_kardex(movimientos, tmp_path):
+    ruta = tmp_path / "kardex.csv"
+    assert exportar(ruta) == [("terminado", True)]
+    with open(ruta, newline="", encoding="utf-8") as f:
+        filas = list(csv.reader(f))[1:]
+    assert [fila[1] for fila in filas] == ["Compra", "Venta", "Inventario Final", "TOTAL"]
+
+
+def test_exportar_sin_movimientos_no_deja_archivo(conn, tmp_path):
+    ruta = tmp_path / "kardex.csv"
+    assert exportar(ruta) == [("terminado", False)]
+    assert not ruta.exists()
+
+
+def test_exportar_cancelado_no_deja_archivo(movimientos, tmp_path):
+    ruta = tmp_path / "kardex.csv"
+    assert exportar(ruta, cancelar=True) == []
+    assert not ruta.exists()
@@ -0,0 +1,23 @@
+from costeo import generar_kardex
+from servicio_compras import registrar_compra
+from servicio_ventas import eliminar_venta, registrar_venta
+
+
+def cortes(conn):
+    return [f for f, in conn.execute("SELECT fecha_corte FROM kardex_cortes ORDER BY fecha_corte")]
+
+
+def test_borrar_una_venta_conserva_los_cortes_anteriores(conn):
+    conn.execute("INSERT INTO productos (nombre, precio) VALUES ('Arroz', 2)")
+    conn.commit()
+    for mes in range(1, 13):
+        registrar_compra(f"2025-{mes:02d}-01", [(1, 10)])
+        id_venta, _ = registrar_venta(f"2025-{mes:02d}-15", [(1, 2, 3.0)])
+    list(generar_kardex(conn, "PEPS", "2026-01-01", "2026-01-31"))
+    antes = cortes(conn)
+    assert "2025-11-30" in antes
+
+    # El detalle se borra en cascada con la venta de diciembre
+    eliminar_venta(id_venta)
+
+    assert cortes(conn) == [f for f in antes if f < "2025-12-15"]
@@ -0,0 +1,85 @@
+import pytest
+
+import database as db
+from costeo import generar_kardex, generar_kardex_paralelo
+from servicio_compras import registrar_compra
+from servicio_ventas import registrar_venta
+
+
+def vender_sin_stock(conn, fecha, id_producto, cantidad, precio):
+    # registrar_venta no deja vender de más; los datos viejos o importados sí
+    cursor = conn.execute("INSERT INTO ventas (fecha, usuario_id, total) VALUES (?, 1, ?)", (fecha, cantidad * precio))
+    conn.execute("INSERT INTO detalle_ventas (id_venta, id_producto, cantidad, precio_unitario) VALUES (?, ?, ?, ?)",
+                 (cursor.lastrowid, id_producto, cantidad, precio))
+    conn.commit()
+
+
+@pytest.fixture
+def movimientos(conn):
+    conn.execute("INSERT INTO productos (nombre, precio) VALUES ('Arroz', 3), ('Frijol', 2)")
+    conn.commit()
+    registrar_compra("2025-01-05", [(1, 10, 2.0)])
+    registrar_venta("2025-01-20", [(1, 4, 3.0)])
+    registrar_compra("2025-01-31", [(2, 3, 1.5)])
+    # Cruce de mes: lo anterior queda en el corte de 2025-01-31
+    registrar_venta("2025-02-01", [(2, 1, 2.0)])
+    registrar_compra("2025-02-03", [(1, 5, 4.0)])
+    vender_sin_stock(conn, "2025-02-10", 1, 14, 3.0)
+    registrar_compra("2025-02-20", [(1, 2, 5.0)])
+    return conn
+
+
+ARROZ_FINAL = ("2025-02-20", "Inventario Final", "Arroz", 4, None, None, None, None, None, None, 2, 5.0, 10.0)
+FRIJOL_FINAL = ("2025-01-31", "Inventario Final", "Frijol", 2, None, None, None, None, None, None, 2, 1.5, 3.0)
+
+ESPERADO = {
+    "PMP": [
+        ("2025-02-01", "Venta", "Frijol", None, None, None, None, 1, 2.0, 2.0, 2, 1.5, 3.0),
+        ("2025-02-03", "Compra", "Arroz", 3, 5, 4.0, 20.0, None, None, None, 11, 32 / 11, 32.0),
+        ("2025-02-10", "Venta", "Arroz", None, None, None, None, 14, 3.0, 42.0, -3, 32 / 11, 0.0),
+        ("2025-02-20", "Compra", "Arroz", 4, 2, 5.0, 10.0, None, None, None, 2, 5.0, 10.0),
+        (None, "TOTAL", "Arroz", None, None, None, None, None, None, None, 2, 5.0, 10.0),
+        (None, "TOTAL", "Frijol", None, None, None, None, None, None, None, 2, 1.5, 3.0),
+    ],
+    "PEPS": [
+        ("2025-02-01", "Venta", "Frijol", 2, None, None, None, 1, 1.5, 1.5, 2, 1.5, 3.0),
+        ("2025-02-03", "Compra", "Arroz", 3, 5, 4.0, 20.0, None, None, None, 5, 4.0, 20.0),
+        ("2025-02-10", "Venta", "Arroz", 1, None, None, None, 6, 2.0, 12.0, 0, 2.0, 0.0),
+        ("2025-02-10", "Venta", "Arroz", 3, None, None, None, 5, 4.0, 20.0, 0, 4.0, 0.0),
+        ("2025-02-10", "Venta", "Arroz", None, None, None, None, 14, 3.0, 42.0, -3, 0.0, 0.0),
+        ("2025-02-20", "Compra", "Arroz", 4, 2, 5.0, 10.0, None, None, None, 2, 5.0, 10.0),
+        ARROZ_FINAL,
+        (None, "TOTAL", "Arroz", None, None, None, None, None, None, None, 2, "", 10.0),
+        FRIJOL_FINAL,
+        (None, "TOTAL", "Frijol", None, None, None, None, None, None, None, 2, "", 3.0),
+    ],
+    "UEPS": [
+        ("2025-02-01", "Venta", "Frijol", 2, None, None, None, 1, 1.5, 1.5, 2, 1.5, 3.0),
+        ("2025-02-03", "Compra", "Arroz", 3, 5, 4.0, 20.0, None, None, None, 5, 4.0, 20.0),
+        # UEPS toma primero el lote más reciente
+        ("2025-02-10", "Venta", "Arroz", 3, None, None, None, 5, 4.0, 20.0, 0, 4.0, 0.0),
+        ("2025-02-10", "Venta", "Arroz", 1, None, None, None, 6, 2.0, 12.0, 0, 2.0, 0.0),
+        ("2025-02-10", "Venta", "Arroz", None, None, None, None, 14, 3.0, 42.0, -3, 0.0, 0.0),
+        ("2025-02-20", "Compra", "Arroz", 4, 2, 5.0, 10.0, None, None, None, 2, 5.0, 10.0),
+        ARROZ_FINAL,
+        (None, "TOTAL", "Arroz", None, None, None, None, None, None, None, 2, "", 10.0),
+        FRIJOL_FINAL,
+        (None, "TOTAL", "Frijol", None, None, None, None, None, None, None, 2, "", 3.0),
+    ],
+}
+
+
+@pytest.mark.parametrize("metodo", ["PMP", "PEPS", "UEPS"])
+def test_kardex_serial_desde_corte_y_paralelo(movimientos, metodo):
+    conn = movimientos
+    esperado = ESPERADO[metodo]
+
+    # Sin cortes: el saldo inicial se arma recorriendo todo enero
+    assert list(generar_kardex(conn, metodo, "2025-02-01", "2025-02-28", guardar_cortes=False)) == esperado
+
+    # La primera vez guarda el corte de enero; la segunda arranca desde él
+    assert list(generar_kardex(conn, metodo, "2025-02-01", "2025-02-28")) == esperado
+    assert conn.execute("SELECT fecha_corte FROM kardex_cortes WHERE metodo = ?", (metodo,)).fetchall() == [("2025-01-31",)]
+    assert list(generar_kardex(conn, metodo, "2025-02-01", "2025-02-28")) == esperado
+
+    assert list(generar_kardex_paralelo(db.DB_NAME, metodo, "2025-02-01", "2025-02-28", procesos=2)) == esperado
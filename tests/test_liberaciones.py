@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+from servicio_compras import registrar_compra
+from servicio_liberaciones import InventarioInsuficiente, liberar_pendientes, liberar_venta
+from servicio_ventas import registrar_venta
+
+TABLAS = {
+    "liberaciones": "SELECT id_liberacion, id_venta, total, cantidad, fecha FROM liberaciones ORDER BY id_liberacion",
+    "liberacion_inventarios": """SELECT id_liberacion, id_inventario, cantidad, total
+                                 FROM liberacion_inventarios ORDER BY id_liberacion, id_inventario""",
+    "inventarios": "SELECT id, cantidad FROM inventarios ORDER BY id",
+}
+
+
+def estado(conn):
+    return {tabla: conn.execute(sql).fetchall() for tabla, sql in TABLAS.items()}
+
+
+@pytest.fixture
+def ventas(conn):
+    """Ventas en orden de fecha; la del 10 de enero no alcanza con los lotes de esa fecha."""
+    conn.execute("INSERT INTO productos (nombre, precio) VALUES ('Arroz', 3), ('Frijol', 2)")
+    conn.commit()
+    registrar_compra("2025-01-05", [(1, 3, 2.0), (2, 5, 1.0)])
+    registrar_compra("2025-01-20", [(1, 10, 3.0)])
+    return [
+        registrar_venta("2025-01-06", [(1, 2, 4.0), (2, 1, 2.0)])[0],
+        registrar_venta("2025-01-10", [(1, 5, 4.0)])[0],
+        registrar_venta("2025-01-21", [(1, 4, 4.0)])[0],
+        registrar_venta("2025-01-25", [(1, 2, 4.0), (2, 2, 2.0)])[0],
+    ]
+
+
+def fecha_venta(conn, id_venta):
+    return conn.execute("SELECT fecha FROM ventas WHERE id_venta = ?", (id_venta,)).fetchone()[0]
+
+
+def test_venta_sin_inventario_a_su_fecha_no_escribe_nada(conn, ventas):
+    antes = estado(conn)
+    with pytest.raises(InventarioInsuficiente) as error:
+        liberar_venta(ventas[1], "PEPS", "2025-01-10")
+    assert error.value.faltantes == {1: 2}
+    assert not conn.in_transaction
+    assert estado(conn) == antes
+
+
+@pytest.mark.parametrize("metodo", ["PEPS", "UEPS"])
+def test_liberar_pendientes_equivale_a_liberar_una_por_una(conn, ventas, tmp_path, metodo):
+    copia = sqlite3.connect(tmp_path / "copia.db")
+    conn.backup(copia)
+    copia.execute("PRAGMA foreign_keys = ON")
+
+    omitidas = []
+    for id_venta in ventas:
+        try:
+            liberar_venta(id_venta, metodo, fecha_venta(conn, id_venta))
+        except InventarioInsuficiente:
+            omitidas.append(id_venta)
+    assert omitidas == [ventas[1]]
+
+    resultado = liberar_pendientes(metodo, conn=copia)
+    assert [id_venta for id_venta, _ in resultado.omitidas] == omitidas
+    assert [id_venta for id_venta, _ in resultado.liberadas] == [v for v in ventas if v not in omitidas]
+    assert estado(copia) == estado(conn)
+    copia.close()
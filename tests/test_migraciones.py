@@ -0,0 +1,22 @@
+import database as db
+from servicio_compras import registrar_compra
+
+
+def test_stock_neto_es_comprado_menos_vendido(conn):
+    conn.execute("INSERT INTO productos (nombre, precio) VALUES ('Arroz', 2), ('Frijol', 1), ('Sal', 1)")
+    conn.commit()
+    registrar_compra("2025-01-02", [(1, 10), (2, 4)])
+    registrar_compra("2025-01-03", [(1, 5)])
+    # Así registraban las ventas las versiones anteriores: sin tocar el stock
+    for id_producto, cantidad in ((1, 3), (1, 4), (2, 6)):
+        cursor = conn.execute("INSERT INTO ventas (fecha, usuario_id, total) VALUES ('2025-01-04', 1, 0)")
+        conn.execute("INSERT INTO detalle_ventas (id_venta, id_producto, cantidad, precio_unitario) VALUES (?, ?, ?, 1)",
+                     (cursor.lastrowid, id_producto, cantidad))
+    conn.execute("PRAGMA user_version = 4")
+    conn.commit()
+
+    assert db.aplicar_migraciones(conn) == [5, 6, 7]
+
+    assert conn.execute("SELECT id_producto, stock FROM productos ORDER BY id_producto").fetchall() == [
+        (1, 15 - 7), (2, 4 - 6), (3, 0)
+    ]
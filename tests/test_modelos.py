@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PyQt6.QtCore")
+from PyQt6.QtCore import QPoint, Qt  # noqa: E402
+from PyQt6.QtTest import QTest  # noqa: E402
+from PyQt6.QtWidgets import QApplication, QTableView  # noqa: E402
+
+from modelos import Columna, DelegadoBoton, ModeloPaginado  # noqa: E402
+
+
+@pytest.fixture
+def tabla(conn):
+    app = QApplication.instance() or QApplication([])
+    conn.executemany("INSERT INTO productos (nombre, precio) VALUES (?, ?)", [("Arroz", 2), ("Frijol", 3)])
+    conn.commit()
+    modelo = ModeloPaginado(
+        [Columna("Producto", "p.nombre"), Columna("Borrar", "NULL", lambda _: "")],
+        "FROM productos p", ("p.id_producto",),
+    )
+    vista = QTableView()
+    vista.setModel(modelo)
+    delegado = DelegadoBoton("Borrar", vista)
+    vista.setItemDelegateForColumn(1, delegado)
+    vista.resize(400, 200)
+    vista.show()
+    QTest.qWaitForWindowExposed(vista)
+    yield modelo, vista, delegado
+    vista.close()
+    app.processEvents()
+
+
+def centro(vista, fila, columna):
+    return vista.visualRect(vista.model().index(fila, columna)).center()
+
+
+def test_valor_por_encabezado_o_clave(tabla):
+    modelo, _, _ = tabla
+    assert modelo.valor(1, "Producto") == "Frijol"
+    assert modelo.valor(1, "p.id_producto") == 2
+    modelo.quitar_filas_con("p.id_producto", 1)
+    assert [modelo.valor(0, "Producto")] == ["Frijol"]
+
+
+def test_soltar_sobre_la_celda_pulsa(tabla):
+    _, vista, delegado = tabla
+    pulsados = []
+    delegado.pulsado.connect(lambda index: pulsados.append(index.row()))
+    QTest.mouseClick(vista.viewport(), Qt.MouseButton.LeftButton, pos=centro(vista, 1, 1))
+    assert pulsados == [1]
+    assert delegado._presionado is None
+
+
+def test_soltar_en_otra_columna_libera_el_boton(tabla):
+    _, vista, delegado = tabla
+    pulsados = []
+    delegado.pulsado.connect(lambda index: pulsados.append(index.row()))
+    QTest.mousePress(vista.viewport(), Qt.MouseButton.LeftButton, pos=centro(vista, 0, 1))
+    assert delegado._presionado is not None
+    QTest.mouseRelease(vista.viewport(), Qt.MouseButton.LeftButton, pos=centro(vista, 0, 0))
+    assert delegado._presionado is None
+    assert pulsados == []
+
+    QTest.mousePress(vista.viewport(), Qt.MouseButton.LeftButton, pos=centro(vista, 0, 1))
+    QTest.mouseRelease(vista.viewport(), Qt.MouseButton.LeftButton, pos=QPoint(-5, -5))
+    assert delegado._presionado is None
+    assert pulsados == []
@@ -0,0 +1,44 @@
+import csv
+
+from costeo import COMPRA, VENTA, Movimiento, MotorCosteo
+from reportes import _acumular_subtotales, exportar_kardex_csv, exportar_kardex_excel
+
+
+def filas_venta_sin_stock(metodo):
+    motor = MotorCosteo(metodo)
+    filas = motor.filas_movimiento(Movimiento("2025-01-01", COMPRA, 1, 0, 1, "Arroz", 3, 10.0))
+    filas += motor.filas_movimiento(Movimiento("2025-01-02", VENTA, 1, 1, 1, "Arroz", 5, 20.0))
+    return filas + motor.filas_finales()
+
+
+def test_subtotales_no_cuentan_dos_veces_el_faltante():
+    for metodo in ("PEPS", "UEPS"):
+        subtotales = {}
+        list(_acumular_subtotales(filas_venta_sin_stock(metodo), subtotales))
+        # Sólo se costean las 3 unidades del lote; las 2 que faltaron no suman
+        assert subtotales["Arroz"] == [3, 30.0, 3, 30.0, 0, 0.0]
+
+
+def test_subtotales_pmp_suman_la_venta_completa():
+    subtotales = {}
+    list(_acumular_subtotales(filas_venta_sin_stock("PMP"), subtotales))
+    assert subtotales["Arroz"][2:4] == [5, 100.0]
+
+
+def test_excel_y_csv_se_leen_con_los_mismos_numeros(tmp_path):
+    filas = filas_venta_sin_stock("PEPS")
+    assert exportar_kardex_excel(tmp_path / "kardex.xlsx", iter(filas)) == len(filas)
+    assert exportar_kardex_csv(tmp_path / "kardex.csv", iter(filas)) == len(filas)
+
+    from openpyxl import load_workbook
+    hoja = load_workbook(tmp_path / "kardex.xlsx", read_only=True)["Kardex"]
+    leidas = list(hoja.iter_rows(min_row=2, values_only=True))
+    # Las celdas sin valor ('-' en pantalla) quedan vacías y los números como números
+    assert leidas == [tuple(None if v == "" else v for v in fila) for fila in filas]
+
+    with open(tmp_path / "kardex.csv", newline="", encoding="utf-8") as f:
+        leidas = list(csv.reader(f))[1:]
+    assert len(leidas) == len(filas)
+    venta = leidas[1]
+    assert (int(venta[7]), float(venta[8]), float(venta[9])) == (3, 10.0, 30.0)
+    assert venta[4:7] == ["", "", ""]
@@ -0,0 +1,37 @@
+import pytest
+
+from servicio_compras import registrar_compra
+from servicio_ventas import StockInsuficiente, registrar_venta
+
+
+@pytest.fixture
+def producto(conn):
+    conn.execute("INSERT INTO productos (nombre, precio) VALUES ('Arroz', 2)")
+    conn.commit()
+    return 1
+
+
+def test_compra_de_un_usuario_inexistente_es_value_error(conn, producto):
+    with pytest.raises(ValueError, match="usuario #99"):
+        registrar_compra("2025-01-02", [(producto, 5)], usuario_id=99)
+    assert conn.execute("SELECT COUNT(*) FROM compras").fetchone()[0] == 0
+
+
+def test_venta_con_cliente_inexistente_es_value_error(conn, producto):
+    registrar_compra("2025-01-02", [(producto, 5)])
+    with pytest.raises(ValueError, match="No se pudo registrar la venta"):
+        registrar_venta("2025-01-03", [(producto, 1, 3.0)], cliente_id=99)
+    assert conn.execute("SELECT stock FROM productos").fetchone()[0] == 5
+
+
+def test_carrito_sin_stock_no_escribe_nada(conn, producto):
+    conn.execute("INSERT INTO productos (nombre, precio) VALUES ('Frijol', 1)")
+    conn.commit()
+    registrar_compra("2025-01-02", [(producto, 5), (2, 1)])
+    with pytest.raises(StockInsuficiente) as error:
+        registrar_venta("2025-01-03", [(producto, 3, 3.0), (2, 1, 2.0), (producto, 3, 3.0)])
+    assert error.value.faltantes == {producto: (5, 6)}
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM ventas").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM detalle_ventas").fetchone()[0] == 0
+    assert conn.execute("SELECT stock FROM productos ORDER BY id_producto").fetchall() == [(5,), (1,)]
@@ -0,0 +1,20 @@
+import sqlite3
+
+import pytest
+
+from servicio_compras import registrar_compra
+from usuario import crear_usuario
+
+
+def test_usuario_repetido_no_deja_la_transaccion_abierta(conn):
+    conn.execute("INSERT INTO productos (nombre, precio) VALUES ('Arroz', 2)")
+    conn.commit()
+    role_id = conn.execute("SELECT role_id FROM usuarios WHERE username = 'ADMIN'").fetchone()[0]
+
+    with pytest.raises(sqlite3.IntegrityError):
+        crear_usuario("ADMIN", "otra", role_id)
+
+    assert not conn.in_transaction
+    # La conexión del hilo sigue sirviendo para las siguientes escrituras
+    registrar_compra("2025-01-02", [(1, 5)])
+    assert conn.execute("SELECT stock FROM productos").fetchone()[0] == 5
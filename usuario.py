@@ -1,5 +1,5 @@
-import sqlite3
 import os
+import sqlite3
 import sys
 from PyQt6.QtWidgets import (
     QMainWindow, QLabel, QPushButton, QWidget, QVBoxLayout, QHBoxLayout,
@@ -8,8 +8,7 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtGui import QIcon, QColor
 from PyQt6.QtCore import Qt
-
-DB_NAME = "sistema.db"
+import database as db
 
 def resource_path(relative_path):
     """Obtiene la ruta absoluta del recurso, compatible con PyInstaller."""
@@ -23,15 +22,14 @@ def resource_path(relative_path):
 # Funciones DB
 # -----------------------------
 def obtener_roles():
-    conn = sqlite3.connect(DB_NAME)
+    conn = db.get_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT id, nombre FROM roles")
     roles = cursor.fetchall()
-    conn.close()
     return roles
 
 def obtener_usuarios():
-    conn = sqlite3.connect(DB_NAME)
+    conn = db.get_connection()
     cursor = conn.cursor()
     cursor.execute("""
         SELECT u.id, u.username, r.nombre 
@@ -39,70 +37,61 @@ def obtener_usuarios():
         JOIN roles r ON u.role_id = r.id
     """)
     usuarios = cursor.fetchall()
-    conn.close()
     return usuarios
 
 def crear_usuario(username, password, role_id):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO usuarios (username, password, role_id) VALUES (?, ?, ?)",
-                   (username, password, role_id))
-    conn.commit()
-    conn.close()
+    with db.transaccion() as cursor:
+        cursor.execute("INSERT INTO usuarios (username, password, role_id) VALUES (?, ?, ?)",
+                       (username, password, role_id))
 
 def modificar_usuario(user_id, username, password, role_id):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE usuarios SET username=?, password=?, role_id=? WHERE id=?",
-                   (username, password, role_id, user_id))
-    conn.commit()
-    conn.close()
+    with db.transaccion() as cursor:
+        cursor.execute("UPDATE usuarios SET username=?, password=?, role_id=? WHERE id=?",
+                       (username, password, role_id, user_id))
 
 def eliminar_usuario(user_id):
-    conn = sqlite3.connect(DB_NAME)
+    conn = db.get_connection()
     cursor = conn.cursor()
-    cursor.execute("DELETE FROM usuarios WHERE id=?", (user_id,))
+    try:
+        cursor.execute("DELETE FROM usuarios WHERE id=?", (user_id,))
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        raise
     conn.commit()
-    conn.close()
 
 def obtener_clientes():
-    conn = sqlite3.connect(DB_NAME)
+    conn = db.get_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT id_cliente, nombre, contacto FROM clientes")
     clientes = cursor.fetchall()
-    conn.close()
     return clientes
 
 def crear_cliente(nombre, contacto):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO clientes (nombre, contacto) VALUES (?, ?)", (nombre, contacto))
-    conn.commit()
-    conn.close()
+    with db.transaccion() as cursor:
+        cursor.execute("INSERT INTO clientes (nombre, contacto) VALUES (?, ?)", (nombre, contacto))
 
 def modificar_cliente(cliente_id, nombre, contacto):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE clientes SET nombre=?, contacto=? WHERE id_cliente=?",
-                   (nombre, contacto, cliente_id))
-    conn.commit()
-    conn.close()
+    with db.transaccion() as cursor:
+        cursor.execute("UPDATE clientes SET nombre=?, contacto=? WHERE id_cliente=?",
+                       (nombre, contacto, cliente_id))
 
 def eliminar_cliente(cliente_id):
-    conn = sqlite3.connect(DB_NAME)
+    conn = db.get_connection()
     cursor = conn.cursor()
-    cursor.execute("DELETE FROM clientes WHERE id_cliente=?", (cliente_id,))
+    try:
+        cursor.execute("DELETE FROM clientes WHERE id_cliente=?", (cliente_id,))
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        raise
     conn.commit()
-    conn.close()
 
 def obtener_proveedores():
     """Devuelve tuplas (id_proveedor, nombre, contacto, direccion)."""
-    conn = sqlite3.connect(DB_NAME)
+    conn = db.get_connection()
     cursor = conn.cursor()
     # Asegurarse de traer la dirección también
     cursor.execute("SELECT id_proveedor, nombre, contacto, direccion FROM proveedores")
     proveedores = cursor.fetchall()
-    conn.close()
 
     # Por seguridad, normalizamos cada fila a 4 elementos (rellenando con cadena vacía si falta)
     normalized = []
@@ -116,27 +105,24 @@ def obtener_proveedores():
     return normalized
 
 def crear_proveedor(nombre, contacto, direccion):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO proveedores (nombre, contacto, direccion) VALUES (?, ?, ?)",
-                   (nombre, contacto, direccion))
-    conn.commit()
-    conn.close()
+    with db.transaccion() as cursor:
+        cursor.execute("INSERT INTO proveedores (nombre, contacto, direccion) VALUES (?, ?, ?)",
+                       (nombre, contacto, direccion))
 
 def modificar_proveedor(proveedor_id, nombre, contacto, direccion):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE proveedores SET nombre=?, contacto=?, direccion=? WHERE id_proveedor=?",
-                   (nombre, contacto, direccion, proveedor_id))
-    conn.commit()
-    conn.close()
+    with db.transaccion() as cursor:
+        cursor.execute("UPDATE proveedores SET nombre=?, contacto=?, direccion=? WHERE id_proveedor=?",
+                       (nombre, contacto, direccion, proveedor_id))
 
 def eliminar_proveedor(proveedor_id):
-    conn = sqlite3.connect(DB_NAME)
+    conn = db.get_connection()
     cursor = conn.cursor()
-    cursor.execute("DELETE FROM proveedores WHERE id_proveedor=?", (proveedor_id,))
+    try:
+        cursor.execute("DELETE FROM proveedores WHERE id_proveedor=?", (proveedor_id,))
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        raise
     conn.commit()
-    conn.close()
 
 # -----------------------------
 # Botón con sombra y estilo
@@ -374,12 +360,17 @@ class EntityWindow(QWidget):
             QMessageBox.warning(self, "Error", "Seleccione un elemento para eliminar")
             return
         item_id = int(self.table.item(row, 0).text())
-        if self.tipo == "Usuarios":
-            eliminar_usuario(item_id)
-        elif self.tipo == "Clientes":
-            eliminar_cliente(item_id)
-        else:
-            eliminar_proveedor(item_id)
+        try:
+            if self.tipo == "Usuarios":
+                eliminar_usuario(item_id)
+            elif self.tipo == "Clientes":
+                eliminar_cliente(item_id)
+            else:
+                eliminar_proveedor(item_id)
+        except sqlite3.IntegrityError:
+            # Las claves foráneas impiden dejar ventas, compras o productos huérfanos
+            QMessageBox.warning(self, "Error", "No se puede eliminar: tiene ventas, compras o productos registrados.")
+            return
         QMessageBox.information(self, "Éxito", f"{self.tipo[:-1]} eliminado correctamente")
         self.load_items()
 
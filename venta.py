@@ -1,15 +1,16 @@
 import sys
 import os
-import sqlite3
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QComboBox, QSpinBox, QLineEdit, QDateEdit, QPushButton, QTableWidget,
-    QTableWidgetItem, QMessageBox
+    QTableWidgetItem, QMessageBox, QTableView, QCheckBox, QAbstractItemView
 )
 from PyQt6.QtCore import QDate
 from PyQt6.QtGui import QIcon
+import consultas
 import database as db  # tu archivo de conexión
-from liberacion import LiberacionWindow  # Importar la ventana de liberación
+from modelos import Columna, ModeloPaginado
+from servicio_ventas import LineaVenta, StockInsuficiente, eliminar_venta, registrar_venta
 
 def resource_path(relative_path):
     """Obtiene la ruta absoluta del recurso, compatible con PyInstaller."""
@@ -20,9 +21,11 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 class VentasWindow(QMainWindow):
-    def __init__(self, role="Usuario"):
+    def __init__(self, role="Usuario", username=None):
         super().__init__()
         self.role = role.lower()
+        # None si la sesión no tiene un usuario válido: no se registra nada a su nombre
+        self.usuario_id = db.id_usuario(username) if username else None
         self.setWindowTitle("Registro de ventas")
         self.setMinimumSize(900, 600)
         self.setWindowIcon(QIcon(resource_path("mainlogo.ico")))
@@ -47,7 +50,6 @@ class VentasWindow(QMainWindow):
 
         # Cliente
         self.cliente_combo = QComboBox()
-        self.load_clientes()
         form_layout.addWidget(QLabel("Cliente:"))
         form_layout.addWidget(self.cliente_combo)
 
@@ -76,113 +78,197 @@ class VentasWindow(QMainWindow):
         form_layout.addWidget(QLabel("Fecha:"))
         form_layout.addWidget(self.fecha_edit)
 
-        # Botón Registrar
-        btn_registrar = QPushButton("Registrar Venta")
-        btn_registrar.clicked.connect(self.confirm_sale)
-        form_layout.addWidget(btn_registrar)
+        btn_agregar = QPushButton("Agregar a la venta")
+        btn_agregar.clicked.connect(self.agregar_linea)
+        form_layout.addWidget(btn_agregar)
 
         layout.addLayout(form_layout)
 
-        # Tabla de ventas
-        self.ventas_table = QTableWidget()
-        self.ventas_table.setColumnCount(6)
-        self.ventas_table.setHorizontalHeaderLabels(
-            ["ID", "Fecha", "Cliente", "Producto", "Cantidad", "Total"]
+        # Líneas de la venta en curso
+        self.carrito = []  # [(LineaVenta, nombre)]
+        self.carrito_table = QTableWidget()
+        self.carrito_table.setColumnCount(4)
+        self.carrito_table.setHorizontalHeaderLabels(["Producto", "Cantidad", "Precio unitario", "Subtotal"])
+        layout.addWidget(self.carrito_table)
+
+        carrito_layout = QHBoxLayout()
+        btn_quitar = QPushButton("Quitar línea")
+        btn_quitar.clicked.connect(self.quitar_linea)
+        carrito_layout.addWidget(btn_quitar)
+        self.total_label = QLabel("Total: 0.00")
+        carrito_layout.addWidget(self.total_label)
+        btn_registrar = QPushButton("Registrar Venta")
+        btn_registrar.clicked.connect(self.confirm_sale)
+        carrito_layout.addWidget(btn_registrar)
+        layout.addLayout(carrito_layout)
+
+        # Filtros del historial (se aplican en la consulta)
+        filtro_layout = QHBoxLayout()
+        self.filtro_fecha_check = QCheckBox("Entre fechas:")
+        filtro_layout.addWidget(self.filtro_fecha_check)
+        self.filtro_desde = QDateEdit()
+        self.filtro_desde.setDate(QDate.currentDate().addMonths(-1))
+        self.filtro_desde.setCalendarPopup(True)
+        filtro_layout.addWidget(self.filtro_desde)
+        self.filtro_hasta = QDateEdit()
+        self.filtro_hasta.setDate(QDate.currentDate())
+        self.filtro_hasta.setCalendarPopup(True)
+        filtro_layout.addWidget(self.filtro_hasta)
+        self.filtro_cliente_combo = QComboBox()
+        filtro_layout.addWidget(QLabel("Cliente:"))
+        filtro_layout.addWidget(self.filtro_cliente_combo)
+        btn_filtrar = QPushButton("Filtrar historial")
+        btn_filtrar.clicked.connect(self.load_ventas)
+        filtro_layout.addWidget(btn_filtrar)
+        layout.addLayout(filtro_layout)
+
+        # Tabla de ventas: se lee por páginas a medida que se hace scroll
+        self.ventas_model = ModeloPaginado(
+            [
+                Columna("ID", "v.id_venta"),
+                Columna("Fecha", "v.fecha"),
+                Columna("Cliente", "c.nombre", lambda nombre: nombre or "Sin cliente"),
+                Columna("Producto", "p.nombre"),
+                Columna("Cantidad", "d.cantidad"),
+                Columna("Total", "d.cantidad * d.precio_unitario", lambda total: f"{total:.2f}"),
+            ],
+            consultas.HISTORIAL_VENTAS_DESDE,
+            consultas.HISTORIAL_VENTAS_CLAVES,
+            parent=self,
         )
+        self.ventas_table = QTableView()
+        self.ventas_table.setModel(self.ventas_model)
+        self.ventas_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.ventas_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         layout.addWidget(self.ventas_table)
 
+        self.load_clientes()
         self.load_ventas()
 
         central.setLayout(layout)
         self.setCentralWidget(central)
 
     def load_clientes(self):
-        conn = sqlite3.connect(db.DB_NAME)
+        conn = db.get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT id_cliente, nombre FROM clientes")
         clientes = cursor.fetchall()
         self.cliente_combo.clear()
+        self.filtro_cliente_combo.clear()
+        self.filtro_cliente_combo.addItem("Todos", None)
         for cid, nombre in clientes:
             self.cliente_combo.addItem(nombre, cid)
-        conn.close()
+            self.filtro_cliente_combo.addItem(nombre, cid)
 
     def load_productos(self):
-        conn = sqlite3.connect(db.DB_NAME)
+        conn = db.get_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT id_producto, nombre FROM productos")
+        cursor.execute("SELECT id_producto, nombre, stock FROM productos")
         productos = cursor.fetchall()
         self.producto_combo.clear()
-        for pid, nombre in productos:
+        # Stock por producto para avisar al armar el carrito; la venta se
+        # vuelve a validar dentro de la transacción al registrarla
+        self.stock_producto = {}
+        for pid, nombre, stock in productos:
             self.producto_combo.addItem(nombre, pid)
-        conn.close()
+            self.stock_producto[pid] = stock
 
     def load_ventas(self):
-        self.ventas_table.setRowCount(0)
-        conn = sqlite3.connect(db.DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT v.id_venta, v.fecha, c.nombre, p.nombre, d.cantidad, d.cantidad*d.precio_unitario
-            FROM ventas v
-            JOIN detalle_ventas d ON v.id_venta = d.id_venta
-            LEFT JOIN clientes c ON v.cliente_id = c.id_cliente
-            JOIN productos p ON d.id_producto = p.id_producto
-            ORDER BY v.id_venta ASC
-        """)
-        rows = cursor.fetchall()
-        self.ventas_table.setRowCount(len(rows))
-        for i, (num, fecha, cliente, producto, cantidad, total) in enumerate(rows):
-            self.ventas_table.setItem(i, 0, QTableWidgetItem(str(num)))
-            self.ventas_table.setItem(i, 1, QTableWidgetItem(fecha))
-            self.ventas_table.setItem(i, 2, QTableWidgetItem(str(cliente) if cliente else "Sin cliente"))
-            self.ventas_table.setItem(i, 3, QTableWidgetItem(producto))
-            self.ventas_table.setItem(i, 4, QTableWidgetItem(str(cantidad)))
-            self.ventas_table.setItem(i, 5, QTableWidgetItem(f"{total:.2f}"))
-        conn.close()
-
-    def confirm_sale(self):
-        cliente_id = self.cliente_combo.currentData()
+        filtros = []
+        if self.filtro_fecha_check.isChecked():
+            filtros.append(("v.fecha BETWEEN ? AND ?", (
+                self.filtro_desde.date().toString("yyyy-MM-dd"),
+                self.filtro_hasta.date().toString("yyyy-MM-dd"),
+            )))
+        cliente_id = self.filtro_cliente_combo.currentData()
+        if cliente_id is not None:
+            filtros.append(("v.cliente_id = ?", (cliente_id,)))
+        self.ventas_model.set_filtros(filtros)
+
+    def agregar_linea(self):
         producto_id = self.producto_combo.currentData()
-        cantidad = self.cantidad_spin.value()
-        precio_unitario_str = self.precio_input.text()
-        fecha = self.fecha_edit.date().toString("yyyy-MM-dd")
+        if producto_id is None:
+            QMessageBox.warning(self, "Error", "No hay productos disponibles para vender.")
+            return
 
         try:
-            precio_unitario = float(precio_unitario_str)
+            precio_unitario = float(self.precio_input.text())
             if precio_unitario <= 0:
                 raise ValueError
         except ValueError:
             QMessageBox.warning(self, "Error", "Precio unitario inválido")
             return
 
-        total = cantidad * precio_unitario
-
-        conn = sqlite3.connect(db.DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO ventas (fecha, cliente_id, usuario_id, total)
-            VALUES (?, ?, ?, ?)
-        """, (fecha, cliente_id, 1, total))  # Reemplaza 1 por self.user_id si lo tienes
+        cantidad = self.cantidad_spin.value()
+        en_carrito = sum(l.cantidad for l, _ in self.carrito if l.id_producto == producto_id)
+        disponible = self.stock_producto.get(producto_id, 0) - en_carrito
+        if cantidad > disponible:
+            QMessageBox.warning(
+                self, "Stock insuficiente",
+                f"Solo hay {max(disponible, 0)} unidades disponibles de {self.producto_combo.currentText()}."
+            )
+            return
 
-        venta_id = cursor.lastrowid
+        self.carrito.append((LineaVenta(producto_id, cantidad, precio_unitario), self.producto_combo.currentText()))
+        self.precio_input.clear()
+        self.refrescar_carrito()
+
+    def quitar_linea(self):
+        fila = self.carrito_table.currentRow()
+        if 0 <= fila < len(self.carrito):
+            del self.carrito[fila]
+            self.refrescar_carrito()
+
+    def refrescar_carrito(self):
+        self.carrito_table.setRowCount(len(self.carrito))
+        total = 0.0
+        for i, (linea, nombre) in enumerate(self.carrito):
+            subtotal = linea.cantidad * linea.precio_unitario
+            total += subtotal
+            self.carrito_table.setItem(i, 0, QTableWidgetItem(nombre))
+            self.carrito_table.setItem(i, 1, QTableWidgetItem(str(linea.cantidad)))
+            self.carrito_table.setItem(i, 2, QTableWidgetItem(f"{linea.precio_unitario:.2f}"))
+            self.carrito_table.setItem(i, 3, QTableWidgetItem(f"{subtotal:.2f}"))
+        self.total_label.setText(f"Total: {total:.2f}")
 
-        cursor.execute("""
-            INSERT INTO detalle_ventas (id_venta, id_producto, cantidad, precio_unitario)
-            VALUES (?, ?, ?, ?)
-        """, (venta_id, producto_id, cantidad, precio_unitario))
+    def confirm_sale(self):
+        if not self.carrito:
+            QMessageBox.warning(self, "Error", "Agregue al menos un producto a la venta.")
+            return
+        if self.usuario_id is None:
+            QMessageBox.warning(self, "Error", "No se pudo identificar al usuario de la sesión; vuelva a iniciar sesión.")
+            return
 
-        conn.commit()
-        conn.close()
+        cliente_id = self.cliente_combo.currentData()
+        fecha = self.fecha_edit.date().toString("yyyy-MM-dd")
+        try:
+            # Venta, detalle y descuento de stock en una sola transacción
+            venta_id, total = registrar_venta(
+                fecha, [linea for linea, _ in self.carrito], cliente_id, self.usuario_id
+            )
+        except StockInsuficiente as e:
+            # Otro usuario pudo haber vendido mientras se armaba el carrito
+            self.load_productos()
+            QMessageBox.warning(self, "Stock insuficiente", str(e))
+            return
+        except ValueError as e:
+            QMessageBox.warning(self, "Error", str(e))
+            return
 
-        self.load_ventas()
+        self.carrito = []
+        self.refrescar_carrito()
+        self.load_productos()
+        # Sólo se agregan las filas nuevas, sin releer el historial
+        self.ventas_model.cargar_nuevas()
         QMessageBox.information(self, "Éxito", f"Venta #{venta_id} registrada correctamente.\nTotal: {total:.2f}")
 
     def eliminar_venta(self):
-        row = self.ventas_table.currentRow()
+        row = self.ventas_table.currentIndex().row()
         if row < 0:
             QMessageBox.warning(self, "Error", "Seleccione una venta para eliminar.")
             return
 
-        venta_id = self.ventas_table.item(row, 0).text()
+        venta_id = self.ventas_model.valor(row, "d.id_venta")
 
         reply = QMessageBox.question(
             self,
@@ -194,20 +280,17 @@ class VentasWindow(QMainWindow):
         if reply != QMessageBox.StandardButton.Yes:
             return
 
-        conn = sqlite3.connect(db.DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM detalle_ventas WHERE id_venta = ?", (venta_id,))
-        cursor.execute("DELETE FROM ventas WHERE id_venta = ?", (venta_id,))
-        conn.commit()
-        conn.close()
+        # Devuelve al stock lo vendido
+        eliminar_venta(venta_id)
 
-        self.load_ventas()
+        self.load_productos()
+        self.ventas_model.quitar_filas_con("d.id_venta", venta_id)
         QMessageBox.information(self, "Eliminado", "Venta eliminada correctamente.")
 
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    window = VentasWindow(role="Administrador")  # Cambiar role para pruebas
+    window = VentasWindow(role="Administrador", username="ADMIN")  # Cambiar role para pruebas
     window.show()
     sys.exit(app.exec())